@@ -1,3 +1,4 @@
 from .ai_server import RestAiServer
 from .knowledge_base import KnowledgeBase, SemanticSearchResult
 from .agent import Agent
+from .shared_resources import SharedResources
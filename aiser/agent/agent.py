@@ -3,12 +3,26 @@ import typing
 
 from ..identifiable_entities import IdentifiableEntity
 from ..models import ChatMessage
+from ..shared_resources import SharedResources
 
 
 class Agent(IdentifiableEntity, ABC):
     def __init__(self, agent_id: str):
         super().__init__(entity_id=agent_id)
 
+    async def startup(self, resources: SharedResources):
+        """
+        Called once per server worker before any request is served.
+        Override it to create expensive objects, such as model clients, that every reply can reuse.
+        """
+        pass
+
+    async def shutdown(self):
+        """
+        Called once per server worker after the last request has been served.
+        """
+        pass
+
     @abstractmethod
     def reply(self, messages: typing.List[ChatMessage]) -> typing.AsyncGenerator[ChatMessage, None]:
         raise NotImplementedError
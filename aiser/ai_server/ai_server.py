@@ -1,9 +1,10 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import List, Optional, Union
 
 from ..knowledge_base import KnowledgeBase
 from ..agent import Agent
 from ..config import AiServerConfig, make_ai_server_config
+from ..shared_resources import SharedResources
 from ..version import __version__
 
 
@@ -19,7 +20,8 @@ class AiServer(ABC):
             complete_url: Optional[bool],
             knowledge_bases: Optional[List[KnowledgeBase]] = None,
             agents: Optional[List[Agent]] = None,
-            config: Optional[AiServerConfig] = None
+            config: Optional[AiServerConfig] = None,
+            shared_resources: Optional[SharedResources] = None
     ):
         super().__init__()
         self._port = port
@@ -29,6 +31,7 @@ class AiServer(ABC):
         self._config: AiServerConfig = config or make_ai_server_config(
             complete_url=complete_url
         )
+        self._shared_resources = shared_resources or SharedResources()
 
     def get_aiser_version(self) -> str:
         return __version__
@@ -37,6 +40,36 @@ class AiServer(ABC):
     def run(self):
         raise NotImplementedError
 
+    async def _start_up_entities(self):
+        await self._shared_resources.open()
+        started_entities: List[Union[Agent, KnowledgeBase]] = []
+        try:
+            for entity in self._get_entities_with_lifecycle():
+                await entity.startup(resources=self._shared_resources)
+                started_entities.append(entity)
+        except BaseException:
+            await self._shut_down_entities(entities=started_entities)
+            raise
+
+    async def _shut_down_entities(self, entities: Optional[List[Union[Agent, KnowledgeBase]]] = None):
+        entities = self._get_entities_with_lifecycle() if entities is None else entities
+        errors: List[Exception] = []
+        for entity in reversed(entities):
+            try:
+                await entity.shutdown()
+            except Exception as error:
+                print(f"Shutdown of {entity.get_id()} failed: {error}")
+                errors.append(error)
+        try:
+            await self._shared_resources.close()
+        except Exception as error:
+            errors.append(error)
+        if len(errors) > 0:
+            raise errors[0]
+
+    def _get_entities_with_lifecycle(self) -> List[Union[Agent, KnowledgeBase]]:
+        return list(self._knowledge_bases) + list(self._agents)
+
     def _get_list_of_identifiable_entity_ids(self) -> List[str]:
         agent_ids = [
             agent.get_id()
@@ -47,3 +80,9 @@ class AiServer(ABC):
             for knowledge_base in self._knowledge_bases
         ]
         return agent_ids + knowledge_base_ids
+
+    def _find_agent(self, agent_id: str) -> Optional[Agent]:
+        for agent in self._agents:
+            if agent.accepts_id(agent_id):
+                return agent
+        return None
@@ -2,7 +2,7 @@ import typing
 import jwt
 import httpx
 import time
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, WebSocket, WebSocketException, status
 from fastapi.security import OAuth2
 
 from aiser.ai_server.authentication.rest_authenticator import RestAuthenticator, TokenVerificationCallable
@@ -52,30 +52,45 @@ class AsymmetricJwtRestAuthenticator(RestAuthenticator):
         self._complete_server_url = complete_server_url
         self._consumer = consumer
 
-    def _make_authentication_dependency(self, acceptable_subjects: typing.List[str]) -> TokenVerificationCallable:
+    def _make_public_key_info_getter(self) -> PublicKeyInfoGetter:
         public_key_info_client = PublicKeyInfoClient(consumer=self._consumer)
-        public_key_info_getter = PublicKeyInfoGetter(public_key_info_client=public_key_info_client)
+        return PublicKeyInfoGetter(public_key_info_client=public_key_info_client)
+
+    async def _is_token_valid(
+            self,
+            token_without_prefix: str,
+            public_key_info_getter: PublicKeyInfoGetter,
+            acceptable_subjects: typing.List[str]
+    ) -> bool:
+        try:
+            public_key = (await public_key_info_getter.get_public_key_info()).publicKey
+            public_key_pem = base64_to_pem(public_key)
+            decoded_jwt = jwt.decode(jwt=token_without_prefix, key=public_key_pem, algorithms=["RS256"], options={
+                "verify_signature": True,
+                "verify_exp": True,
+                "verify_nbf": True,
+                "verify_iat": True,
+                "verify_aud": False,
+            })
+        except jwt.exceptions.InvalidTokenError:
+            return False
+
+        if (self._complete_server_url is not None) and (decoded_jwt['aud'] != self._complete_server_url):
+            return False
+        return decoded_jwt['sub'] in acceptable_subjects
+
+    def _make_authentication_dependency(self, acceptable_subjects: typing.List[str]) -> TokenVerificationCallable:
+        public_key_info_getter = self._make_public_key_info_getter()
 
         auth_scheme = OAuth2()
 
         async def verify_token(token: str = Depends(auth_scheme)) -> str:
-            try:
-                token_without_prefix = token.split(" ")[1]
-                public_key = (await public_key_info_getter.get_public_key_info()).publicKey
-                public_key_pem = base64_to_pem(public_key)
-                decoded_jwt = jwt.decode(jwt=token_without_prefix, key=public_key_pem, algorithms=["RS256"], options={
-                    "verify_signature": True,
-                    "verify_exp": True,
-                    "verify_nbf": True,
-                    "verify_iat": True,
-                    "verify_aud": False,
-                })
-
-                if (self._complete_server_url is not None) and (decoded_jwt['aud'] != self._complete_server_url):
-                    raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-                if decoded_jwt['sub'] not in acceptable_subjects:
-                    raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-            except jwt.exceptions.InvalidTokenError as error:
+            token_parts = token.split(" ")
+            if len(token_parts) < 2 or not await self._is_token_valid(
+                    token_without_prefix=token_parts[1],
+                    public_key_info_getter=public_key_info_getter,
+                    acceptable_subjects=acceptable_subjects
+            ):
                 raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
             return token
 
@@ -83,3 +98,23 @@ class AsymmetricJwtRestAuthenticator(RestAuthenticator):
 
     def get_authentication_dependency(self, acceptable_subjects: typing.List[str]) -> TokenVerificationCallable:
         return self._make_authentication_dependency(acceptable_subjects=acceptable_subjects)
+
+    def get_websocket_authentication_dependency(
+            self,
+            acceptable_subjects: typing.List[str]
+    ) -> TokenVerificationCallable:
+        public_key_info_getter = self._make_public_key_info_getter()
+
+        async def verify_websocket_token(websocket: WebSocket) -> str:
+            # Browsers cannot set headers on websocket handshakes, so the token may also come as a query parameter.
+            token = websocket.headers.get("Authorization") or websocket.query_params.get("token") or ""
+            token_without_prefix = token.split(" ")[-1]
+            if not token_without_prefix or not await self._is_token_valid(
+                    token_without_prefix=token_without_prefix,
+                    public_key_info_getter=public_key_info_getter,
+                    acceptable_subjects=acceptable_subjects
+            ):
+                raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason="Invalid token")
+            return token
+
+        return verify_websocket_token
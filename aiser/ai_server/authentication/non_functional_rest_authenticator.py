@@ -8,3 +8,9 @@ class NonFunctionalRestAuthenticator(RestAuthenticator):
             return ''
 
         return verify_token
+
+    def get_websocket_authentication_dependency(
+            self,
+            acceptable_subjects: typing.List[str]
+    ) -> TokenVerificationCallable:
+        return self.get_authentication_dependency(acceptable_subjects=acceptable_subjects)
@@ -1,6 +1,8 @@
 from abc import ABC, abstractmethod
 import typing
 
+from fastapi import WebSocketException, status
+
 TokenVerifyCoroutine = typing.Coroutine[typing.Any, typing.Any, str]
 TokenVerificationCallable = typing.Callable[[...], TokenVerifyCoroutine]
 
@@ -9,3 +11,16 @@ class RestAuthenticator(ABC):
     @abstractmethod
     def get_authentication_dependency(self, acceptable_subjects: typing.List[str]) -> TokenVerificationCallable:
         raise NotImplementedError
+
+    def get_websocket_authentication_dependency(
+            self,
+            acceptable_subjects: typing.List[str]
+    ) -> TokenVerificationCallable:
+        """
+        Returns the dependency that authenticates a websocket connection once, before it is accepted.
+        Authenticators that do not support websockets refuse every connection.
+        """
+        async def refuse_connection() -> str:
+            raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason="Websockets are not supported")
+
+        return refuse_connection
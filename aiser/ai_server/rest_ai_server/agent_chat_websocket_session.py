@@ -0,0 +1,177 @@
+import asyncio
+import contextlib
+import typing
+
+import pydantic
+from fastapi import WebSocket, WebSocketDisconnect
+
+from aiser.agent import Agent
+from aiser.models import ChatMessage
+from aiser.models.dtos import (
+    AgentChatStreamClientFrame,
+    AgentChatStreamStartFrame,
+    AgentChatStreamCreditFrame,
+    AgentChatStreamCancelFrame,
+    AgentChatStreamMessageFrame,
+    AgentChatStreamEndFrame,
+    AgentChatStreamErrorFrame,
+    ChatMessageDto
+)
+
+AgentFinder = typing.Callable[[str], typing.Optional[Agent]]
+
+
+class AgentChatStream:
+    """
+    One chat multiplexed over a websocket connection. Messages are only sent while the consumer has granted credit.
+    """
+
+    def __init__(self, stream_id: str, initial_credit: int):
+        self.stream_id = stream_id
+        self.is_cancel_requested = False
+        self._credit = initial_credit
+        self._credit_changed = asyncio.Condition()
+        self._task: typing.Optional[asyncio.Task] = None
+
+    def start(self, coroutine: typing.Coroutine) -> asyncio.Task:
+        self._task = asyncio.create_task(coroutine)
+        return self._task
+
+    async def grant_credit(self, amount: int):
+        async with self._credit_changed:
+            self._credit += amount
+            self._credit_changed.notify_all()
+
+    async def consume_credit(self):
+        async with self._credit_changed:
+            await self._credit_changed.wait_for(lambda: self._credit > 0)
+            self._credit -= 1
+
+    def cancel(self, requested_by_consumer: bool):
+        self.is_cancel_requested = self.is_cancel_requested or requested_by_consumer
+        if self._task is not None:
+            self._task.cancel()
+
+    async def wait_until_finished(self):
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+
+
+class AgentChatWebSocketSession:
+    """
+    Serves any number of concurrent agent chats over one already authenticated websocket connection.
+    Every frame carries a stream id chosen by the consumer, which is how chats are told apart.
+    """
+
+    def __init__(
+            self,
+            websocket: WebSocket,
+            find_agent: AgentFinder,
+            max_concurrent_streams: int = 32
+    ):
+        self._websocket = websocket
+        self._find_agent = find_agent
+        self._max_concurrent_streams = max_concurrent_streams
+        self._streams: typing.Dict[str, AgentChatStream] = {}
+        self._send_lock = asyncio.Lock()
+        self._pending_sends: typing.Set[asyncio.Task] = set()
+        self._client_frame_adapter = pydantic.TypeAdapter(AgentChatStreamClientFrame)
+
+    async def run(self):
+        await self._websocket.accept()
+        try:
+            while True:
+                message = await self._websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                raw_frame = message.get("text")
+                if raw_frame is None:
+                    await self._send(AgentChatStreamErrorFrame(detail="Only text frames are supported"))
+                    continue
+                await self._handle_raw_frame(raw_frame=raw_frame)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            await self._close_all_streams()
+
+    async def _handle_raw_frame(self, raw_frame: str):
+        try:
+            frame = self._client_frame_adapter.validate_json(raw_frame)
+        except pydantic.ValidationError as error:
+            await self._send(AgentChatStreamErrorFrame(detail=f"Invalid frame: {error}"))
+            return
+
+        if isinstance(frame, AgentChatStreamStartFrame):
+            await self._start_stream(frame=frame)
+        elif isinstance(frame, AgentChatStreamCreditFrame):
+            stream = self._streams.get(frame.streamId)
+            if stream is not None:
+                await stream.grant_credit(amount=frame.amount)
+        elif isinstance(frame, AgentChatStreamCancelFrame):
+            stream = self._streams.get(frame.streamId)
+            if stream is not None:
+                stream.cancel(requested_by_consumer=True)
+
+    async def _start_stream(self, frame: AgentChatStreamStartFrame):
+        if frame.streamId in self._streams:
+            await self._send(AgentChatStreamErrorFrame(streamId=frame.streamId, detail="Stream id already in use"))
+            return
+        if len(self._streams) >= self._max_concurrent_streams:
+            await self._send(AgentChatStreamErrorFrame(streamId=frame.streamId, detail="Too many concurrent streams"))
+            return
+        agent = self._find_agent(frame.agentId)
+        if agent is None:
+            await self._send(AgentChatStreamErrorFrame(streamId=frame.streamId, detail="Agent not found"))
+            return
+
+        stream = AgentChatStream(stream_id=frame.streamId, initial_credit=frame.credit)
+        self._streams[stream.stream_id] = stream
+        messages = [ChatMessage(text_content=message_dto.textContent) for message_dto in frame.messages]
+        task = stream.start(self._run_stream(stream=stream, agent=agent, messages=messages))
+        # A task cancelled before its first step never enters _run_stream, so cleanup can not live there.
+        task.add_done_callback(lambda finished_task: self._finish_stream(stream=stream, task=finished_task))
+
+    async def _run_stream(self, stream: AgentChatStream, agent: Agent, messages: typing.List[ChatMessage]):
+        try:
+            async with contextlib.aclosing(agent.reply(messages=messages)) as message_gen:
+                async for message in message_gen:
+                    await stream.consume_credit()
+                    await self._send(AgentChatStreamMessageFrame(
+                        streamId=stream.stream_id,
+                        outputMessage=ChatMessageDto(textContent=message.text_content)
+                    ))
+            await self._send(AgentChatStreamEndFrame(streamId=stream.stream_id))
+        except asyncio.CancelledError:
+            if not stream.is_cancel_requested:
+                raise
+            await self._send_if_still_connected(AgentChatStreamEndFrame(streamId=stream.stream_id, cancelled=True))
+        except Exception as error:
+            await self._send_if_still_connected(AgentChatStreamErrorFrame(streamId=stream.stream_id, detail=str(error)))
+
+    def _finish_stream(self, stream: AgentChatStream, task: asyncio.Task):
+        if self._streams.get(stream.stream_id) is stream:
+            del self._streams[stream.stream_id]
+        if task.cancelled() and stream.is_cancel_requested:
+            send = asyncio.create_task(
+                self._send_if_still_connected(AgentChatStreamEndFrame(streamId=stream.stream_id, cancelled=True))
+            )
+            self._pending_sends.add(send)
+            send.add_done_callback(self._pending_sends.discard)
+
+    async def _send(self, frame: pydantic.BaseModel):
+        async with self._send_lock:
+            await self._websocket.send_text(frame.model_dump_json())
+
+    async def _send_if_still_connected(self, frame: pydantic.BaseModel):
+        # Used from error handlers, where the error may well be that the socket is already closed.
+        try:
+            await self._send(frame)
+        except Exception:
+            pass
+
+    async def _close_all_streams(self):
+        streams = list(self._streams.values())
+        for stream in streams:
+            stream.cancel(requested_by_consumer=False)
+        for stream in streams:
+            await stream.wait_until_finished()
@@ -0,0 +1,213 @@
+import asyncio
+import collections
+import contextlib
+import itertools
+import os
+import time
+import typing
+import uuid
+
+from aiser.models import ChatMessage
+
+ChatStreamFrame = typing.Tuple[int, ChatMessage]
+
+
+class ReplayUnavailableError(Exception):
+    pass
+
+
+class ChatStreamFailedError(Exception):
+    pass
+
+
+class ChatStream:
+    """
+    Agent reply that keeps being generated when its consumer disconnects, so the consumer can resume it.
+
+    Every message becomes a frame numbered from 0. The last replay_buffer_size frames are kept for replay.
+    Frames that were not yet delivered to any consumer, or not yet to every attached consumer, are never dropped:
+    generation pauses instead.
+    If generation fails or is stopped, consumers get a ChatStreamFailedError after the last frame.
+    """
+
+    def __init__(self, stream_id: str, agent_id: str, replay_buffer_size: int):
+        self.stream_id = stream_id
+        self.agent_id = agent_id
+        self._replay_buffer_size = replay_buffer_size
+        self._frames: typing.Deque[ChatStreamFrame] = collections.deque()
+        self._next_sequence_number = 0
+        self._last_delivered_sequence_number = -1
+        self._next_sequence_number_by_consumer: typing.Dict[object, int] = {}
+        self._is_finished = False
+        self._failure_detail: typing.Optional[str] = None
+        self._last_activity_timestamp = time.monotonic()
+        self._changed = asyncio.Condition()
+        self._task: typing.Optional[asyncio.Task] = None
+
+    def start(self, message_gen: typing.AsyncGenerator[ChatMessage, None]):
+        self._task = asyncio.create_task(self._produce(message_gen=message_gen))
+
+    def cancel(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    async def wait_until_finished(self):
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    @property
+    def next_sequence_number(self) -> int:
+        return self._next_sequence_number
+
+    def is_expired(self, time_to_live_in_seconds: float) -> bool:
+        return (len(self._next_sequence_number_by_consumer) == 0
+                and (time.monotonic() - self._last_activity_timestamp) > time_to_live_in_seconds)
+
+    def can_replay_from(self, sequence_number: int) -> bool:
+        return self._get_oldest_available_sequence_number() <= sequence_number
+
+    async def read_from(self, sequence_number: int) -> typing.AsyncGenerator[ChatStreamFrame, None]:
+        if not self.can_replay_from(sequence_number=sequence_number):
+            raise ReplayUnavailableError(f"Frames before {self._get_oldest_available_sequence_number()} were dropped")
+        if sequence_number > self._next_sequence_number:
+            raise ValueError(f"Frame {sequence_number} is ahead of the next frame {self._next_sequence_number}")
+        consumer = object()
+        self._next_sequence_number_by_consumer[consumer] = sequence_number
+        try:
+            next_sequence_number = sequence_number
+            while True:
+                async with self._changed:
+                    await self._changed.wait_for(
+                        lambda: next_sequence_number < self._next_sequence_number or self._is_finished
+                    )
+                    if not self.can_replay_from(sequence_number=next_sequence_number):
+                        raise ReplayUnavailableError(f"Frame {next_sequence_number} was dropped")
+                    first_position = next_sequence_number - self._get_oldest_available_sequence_number()
+                    pending_frames = list(itertools.islice(self._frames, first_position, None))
+                    if len(pending_frames) == 0 and self._is_finished:
+                        if self._failure_detail is not None:
+                            raise ChatStreamFailedError(self._failure_detail)
+                        return
+
+                for frame in pending_frames:
+                    yield frame
+                    next_sequence_number = frame[0] + 1
+
+                async with self._changed:
+                    self._last_delivered_sequence_number = max(
+                        self._last_delivered_sequence_number,
+                        next_sequence_number - 1
+                    )
+                    self._next_sequence_number_by_consumer[consumer] = next_sequence_number
+                    self._changed.notify_all()
+        finally:
+            del self._next_sequence_number_by_consumer[consumer]
+            self._last_activity_timestamp = time.monotonic()
+            async with self._changed:
+                # The producer may have been waiting for this consumer to catch up.
+                self._changed.notify_all()
+
+    async def _produce(self, message_gen: typing.AsyncGenerator[ChatMessage, None]):
+        try:
+            async with contextlib.aclosing(message_gen):
+                async for message in message_gen:
+                    async with self._changed:
+                        await self._changed.wait_for(self._has_room_for_frame)
+                        if len(self._frames) >= self._replay_buffer_size:
+                            self._frames.popleft()
+                        self._frames.append((self._next_sequence_number, message))
+                        self._next_sequence_number += 1
+                        self._changed.notify_all()
+        except asyncio.CancelledError:
+            self._failure_detail = "Agent reply was stopped"
+            raise
+        except Exception as error:
+            print(f"Chat stream {self.stream_id} stopped: {error}")
+            self._failure_detail = f"Agent reply failed: {error}"
+        finally:
+            async with self._changed:
+                self._is_finished = True
+                self._last_activity_timestamp = time.monotonic()
+                self._changed.notify_all()
+
+    def _has_room_for_frame(self) -> bool:
+        if len(self._frames) < self._replay_buffer_size:
+            return True
+        oldest_sequence_number = self._frames[0][0]
+        return (oldest_sequence_number <= self._last_delivered_sequence_number
+                and all(
+                    oldest_sequence_number < next_sequence_number
+                    for next_sequence_number in self._next_sequence_number_by_consumer.values()
+                ))
+
+    def _get_oldest_available_sequence_number(self) -> int:
+        return self._frames[0][0] if len(self._frames) > 0 else self._next_sequence_number
+
+
+class ChatStreamRegistry:
+    """
+    Chat streams of one server process, kept for time_to_live_in_seconds after their last consumer left
+    or their generation finished, whichever is later. Expired streams are dropped, and their generation stopped,
+    whenever a stream is started or looked up and, between open() and close(), every half time to live.
+
+    Streams live in the memory of the worker process that started them, so resuming a stream needs a single worker
+    or routing that sends every request of a stream to the same worker. Stream ids start with the id of that process,
+    which tells a stream of another worker apart from one that is gone.
+    """
+
+    def __init__(self, replay_buffer_size: int = 1024, time_to_live_in_seconds: float = 300):
+        self._replay_buffer_size = replay_buffer_size
+        self._time_to_live_in_seconds = time_to_live_in_seconds
+        self._streams: typing.Dict[str, ChatStream] = {}
+        self._sweep_task: typing.Optional[asyncio.Task] = None
+
+    def open(self):
+        if self._sweep_task is None:
+            self._sweep_task = asyncio.create_task(self._sweep_expired_streams())
+
+    def start_stream(self, agent_id: str, message_gen: typing.AsyncGenerator[ChatMessage, None]) -> ChatStream:
+        self._drop_expired_streams()
+        chat_stream = ChatStream(
+            stream_id=f"{os.getpid()}-{uuid.uuid4().hex}",
+            agent_id=agent_id,
+            replay_buffer_size=self._replay_buffer_size
+        )
+        self._streams[chat_stream.stream_id] = chat_stream
+        chat_stream.start(message_gen=message_gen)
+        return chat_stream
+
+    def get_stream(self, stream_id: str, agent_id: str) -> typing.Optional[ChatStream]:
+        self._drop_expired_streams()
+        chat_stream = self._streams.get(stream_id)
+        if chat_stream is None or chat_stream.agent_id != agent_id:
+            return None
+        return chat_stream
+
+    def is_from_other_process(self, stream_id: str) -> bool:
+        process_id, separator, _ = stream_id.partition("-")
+        return separator != "" and process_id != str(os.getpid())
+
+    async def close(self):
+        if self._sweep_task is not None:
+            self._sweep_task.cancel()
+            self._sweep_task = None
+        chat_streams = list(self._streams.values())
+        self._streams = {}
+        for chat_stream in chat_streams:
+            chat_stream.cancel()
+        for chat_stream in chat_streams:
+            await chat_stream.wait_until_finished()
+
+    async def _sweep_expired_streams(self):
+        while True:
+            await asyncio.sleep(self._time_to_live_in_seconds / 2)
+            self._drop_expired_streams()
+
+    def _drop_expired_streams(self):
+        expired_stream_ids = [
+            stream_id
+            for stream_id, chat_stream in self._streams.items()
+            if chat_stream.is_expired(time_to_live_in_seconds=self._time_to_live_in_seconds)
+        ]
+        for stream_id in expired_stream_ids:
+            self._streams.pop(stream_id).cancel()
@@ -1,10 +1,21 @@
+import contextlib
+import inspect
+import multiprocessing
+import signal
 import time
 import typing
 
 import uvicorn
-from fastapi import FastAPI, HTTPException, Depends, APIRouter, Request, status
+from fastapi import FastAPI, HTTPException, Depends, APIRouter, Request, WebSocket, WebSocketException, status
 from fastapi.responses import StreamingResponse
 from aiser.ai_server.ai_server import AiServer
+from aiser.ai_server.rest_ai_server.agent_chat_websocket_session import AgentChatWebSocketSession
+from aiser.ai_server.rest_ai_server.chat_stream_registry import (
+    ChatStream,
+    ChatStreamRegistry,
+    ChatStreamFailedError,
+    ReplayUnavailableError
+)
 from aiser.ai_server.authentication import (
     AsymmetricJwtRestAuthenticator,
     NonFunctionalRestAuthenticator,
@@ -14,15 +25,18 @@ from aiser.config.ai_server_config import ServerEnvironment
 from aiser.models.dtos import (
     SemanticSearchRequest,
     AgentChatRequest,
+    AgentChatResumeRequest,
     SemanticSearchResultDto,
     SemanticSearchResultResponseDto,
     AgentChatResponse,
+    AgentChatErrorResponse,
     ChatMessageDto,
     VersionInfo
 )
 from aiser.models import ChatMessage
 from aiser.knowledge_base import KnowledgeBase
 from aiser.agent import Agent
+from aiser.shared_resources import SharedResources
 from aiser.config import AiServerConfig
 from aiser.utils import meets_minimum_version
 
@@ -37,7 +51,10 @@ class RestAiServer(AiServer):
             port: int = 5000,
             workers: typing.Optional[int] = None,
             config: typing.Optional[AiServerConfig] = None,
-            authenticator: typing.Optional[RestAuthenticator] = None
+            authenticator: typing.Optional[RestAuthenticator] = None,
+            shared_resources: typing.Optional[SharedResources] = None,
+            chat_replay_buffer_size: int = 1024,
+            chat_replay_time_to_live_in_seconds: float = 300
     ):
         super().__init__(
             complete_url=complete_url,
@@ -45,9 +62,12 @@ class RestAiServer(AiServer):
             agents=agents,
             host=host,
             port=port,
-            config=config
+            config=config,
+            shared_resources=shared_resources
         )
         self._workers = workers
+        self._chat_replay_buffer_size = chat_replay_buffer_size
+        self._chat_replay_time_to_live_in_seconds = chat_replay_time_to_live_in_seconds
         self._authenticator = authenticator or self._determine_authenticator_fallback()
 
     def _determine_authenticator_fallback(self) -> RestAuthenticator:
@@ -63,26 +83,47 @@ class RestAiServer(AiServer):
             acceptable_subjects=self._get_list_of_identifiable_entity_ids()
         )
 
-        def verify_meets_minimum_version(request: Request):
-            min_version = request.headers.get("Min-Aiser-Version")
+        verify_websocket_token = self._authenticator.get_websocket_authentication_dependency(
+            acceptable_subjects=self._get_list_of_identifiable_entity_ids()
+        )
+
+        def get_minimum_version_error_message(min_version: typing.Optional[str]) -> typing.Optional[str]:
             if min_version is None:
-                return
+                return None
             if not meets_minimum_version(
                     current_version=self.get_aiser_version(),
                     min_version=min_version
             ):
                 error_message = f"Minimum version required: {min_version}. Current version: {self.get_aiser_version()}"
                 print(error_message)
+                return error_message
+            return None
+
+        def verify_meets_minimum_version(request: Request):
+            error_message = get_minimum_version_error_message(min_version=request.headers.get("Min-Aiser-Version"))
+            if error_message is not None:
                 raise HTTPException(
                     status_code=status.HTTP_426_UPGRADE_REQUIRED,
                     detail=error_message
                 )
 
+        def verify_websocket_meets_minimum_version(websocket: WebSocket):
+            error_message = get_minimum_version_error_message(min_version=websocket.headers.get("Min-Aiser-Version"))
+            if error_message is not None:
+                raise WebSocketException(
+                    code=status.WS_1008_POLICY_VIOLATION,
+                    reason=error_message
+                )
+
         non_authenticated_router = APIRouter()
         authenticated_router = APIRouter(dependencies=[
             Depends(verify_token),
             Depends(verify_meets_minimum_version)
         ])
+        authenticated_websocket_router = APIRouter(dependencies=[
+            Depends(verify_websocket_token),
+            Depends(verify_websocket_meets_minimum_version)
+        ])
 
         @non_authenticated_router.get("/")
         async def read_root():
@@ -102,6 +143,8 @@ class RestAiServer(AiServer):
                         query_text=request.text,
                         desired_number_of_results=request.numResults
                     )
+                    if inspect.isawaitable(results):
+                        results = await results
                     result_dto = SemanticSearchResultResponseDto(results=[
                         SemanticSearchResultDto(content=result.content, score=result.score)
                         for result in results
@@ -109,33 +152,138 @@ class RestAiServer(AiServer):
                     return result_dto
             raise HTTPException(status_code=404, detail="Knowledge base not found")
 
-        async def convert_agent_message_gen_to_streaming_response(
-                message_gen: typing.AsyncGenerator[ChatMessage, None]) -> typing.AsyncGenerator[str, None]:
-            async for item in message_gen:
-                message_dto = ChatMessageDto(textContent=item.text_content)
-                yield AgentChatResponse(outputMessage=message_dto).model_dump_json(by_alias=True) + "\n"
+        chat_streams = ChatStreamRegistry(
+            replay_buffer_size=self._chat_replay_buffer_size,
+            time_to_live_in_seconds=self._chat_replay_time_to_live_in_seconds
+        )
+
+        async def convert_chat_stream_to_streaming_response(
+                chat_stream: ChatStream,
+                from_sequence_number: int
+        ) -> typing.AsyncGenerator[str, None]:
+            try:
+                async for sequence_number, item in chat_stream.read_from(sequence_number=from_sequence_number):
+                    message_dto = ChatMessageDto(textContent=item.text_content)
+                    yield AgentChatResponse(
+                        outputMessage=message_dto,
+                        streamId=chat_stream.stream_id,
+                        sequenceNumber=sequence_number
+                    ).model_dump_json(by_alias=True) + "\n"
+            except (ChatStreamFailedError, ReplayUnavailableError, ValueError) as error:
+                # The status line is already sent, so a truncated reply is marked by a final error line instead.
+                # Replay errors get here too when the producer drops frames after the resume endpoint checked them.
+                yield AgentChatErrorResponse(
+                    streamId=chat_stream.stream_id,
+                    detail=str(error)
+                ).model_dump_json(by_alias=True) + "\n"
+
+        def make_chat_streaming_response(chat_stream: ChatStream, from_sequence_number: int) -> StreamingResponse:
+            return StreamingResponse(
+                convert_chat_stream_to_streaming_response(
+                    chat_stream=chat_stream,
+                    from_sequence_number=from_sequence_number
+                ),
+                media_type="text/event-stream",
+                headers={"Aiser-Stream-Id": chat_stream.stream_id}
+            )
 
         @authenticated_router.post("/agent/{agent_id}/chat")
         async def agent_chat(
                 agent_id: str,
                 request: AgentChatRequest,
         ) -> StreamingResponse:
-            for agent in self._agents:
-                if agent.accepts_id(agent_id):
-                    messages = [ChatMessage(text_content=messageDto.textContent) for messageDto in request.messages]
-                    response_generator = agent.reply(messages=messages)
-                    response_generator = convert_agent_message_gen_to_streaming_response(message_gen=response_generator)
-                    return StreamingResponse(
-                        response_generator,
-                        media_type="text/event-stream"
-                    )
-            raise HTTPException(status_code=404, detail="Agent not found")
+            agent = self._find_agent(agent_id)
+            if agent is None:
+                raise HTTPException(status_code=404, detail="Agent not found")
+            messages = [ChatMessage(text_content=messageDto.textContent) for messageDto in request.messages]
+            chat_stream = chat_streams.start_stream(agent_id=agent_id, message_gen=agent.reply(messages=messages))
+            return make_chat_streaming_response(chat_stream=chat_stream, from_sequence_number=0)
 
-        app = FastAPI()
+        @authenticated_router.post("/agent/{agent_id}/chat/{stream_id}/resume")
+        async def resume_agent_chat(
+                agent_id: str,
+                stream_id: str,
+                request: AgentChatResumeRequest,
+        ) -> StreamingResponse:
+            chat_stream = chat_streams.get_stream(stream_id=stream_id, agent_id=agent_id)
+            if chat_stream is None and chat_streams.is_from_other_process(stream_id=stream_id):
+                raise HTTPException(
+                    status_code=status.HTTP_421_MISDIRECTED_REQUEST,
+                    detail="Chat stream belongs to another server worker, resuming needs one worker or sticky routing"
+                )
+            if chat_stream is None:
+                raise HTTPException(status_code=404, detail="Chat stream not found")
+            if request.fromSequenceNumber > chat_stream.next_sequence_number:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="fromSequenceNumber is ahead of the chat stream"
+                )
+            if not chat_stream.can_replay_from(sequence_number=request.fromSequenceNumber):
+                raise HTTPException(
+                    status_code=status.HTTP_410_GONE,
+                    detail="Chat stream frames are no longer available"
+                )
+            return make_chat_streaming_response(
+                chat_stream=chat_stream,
+                from_sequence_number=request.fromSequenceNumber
+            )
+
+        @authenticated_websocket_router.websocket("/agent/chat/ws")
+        async def agent_chat_websocket(websocket: WebSocket):
+            session = AgentChatWebSocketSession(websocket=websocket, find_agent=self._find_agent)
+            await session.run()
+
+        @contextlib.asynccontextmanager
+        async def lifespan(_: FastAPI):
+            await self._start_up_entities()
+            chat_streams.open()
+            try:
+                yield
+            finally:
+                await chat_streams.close()
+                await self._shut_down_entities()
+
+        app = FastAPI(lifespan=lifespan)
         app.include_router(authenticated_router)
+        app.include_router(authenticated_websocket_router)
         app.include_router(non_authenticated_router)
 
         return app
 
     def run(self):
-        uvicorn.run(app=self.get_app(), port=self._port, host=self._host, workers=self._workers or 1)
+        workers = self._workers or 1
+        if workers == 1:
+            uvicorn.run(app=self.get_app(), port=self._port, host=self._host)
+            return
+        self._run_forked_workers(workers=workers)
+
+    def _run_forked_workers(self, workers: int):
+        # uvicorn only starts several workers from an import string, which cannot carry this server object.
+        # Instead, the socket is bound once and every forked worker serves its own copy of the app,
+        # running the lifespan, and with it the startup and shutdown hooks, once per worker.
+        if "fork" not in multiprocessing.get_all_start_methods():
+            raise RuntimeError("Running several workers requires a platform that supports forking processes")
+        config = uvicorn.Config(app=self.get_app(), port=self._port, host=self._host)
+        sock = config.bind_socket()
+        fork_context = multiprocessing.get_context("fork")
+        processes = [
+            fork_context.Process(target=uvicorn.Server(config=config).run, kwargs={"sockets": [sock]})
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+
+        def stop_workers(*_):
+            for worker_process in processes:
+                worker_process.terminate()
+
+        previous_sigterm_handler = signal.signal(signal.SIGTERM, stop_workers)
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.join()
+        finally:
+            signal.signal(signal.SIGTERM, previous_sigterm_handler)
+            sock.close()
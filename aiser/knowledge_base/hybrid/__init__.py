@@ -0,0 +1,4 @@
+from .hybrid_knowledge_base import HybridKnowledgeBase, ScoreFusion, EmbeddingFunction
+from .bm25_index import Bm25Index
+from .vector_index import VectorIndex, Float32VectorIndex
+from .quantized_vector_index import Int8VectorIndex, ProductQuantizedVectorIndex, DiskVectorStore
@@ -0,0 +1,138 @@
+import array
+import bisect
+import math
+import re
+import typing
+
+import numpy as np
+
+from .ranking import RankedSlots, select_top_k
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> typing.List[str]:
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class _PostingList:
+    """
+    Document slots containing a term, kept sorted, with the term frequency in each of them.
+    Both live in flat typed arrays so they can be scored as numpy views without copying.
+    """
+
+    def __init__(self):
+        self.slots = array.array("I")
+        self.term_frequencies = array.array("f")
+
+    def append(self, slot: int, term_frequency: int):
+        self.slots.append(slot)
+        self.term_frequencies.append(term_frequency)
+
+    def remove(self, slot: int):
+        position = bisect.bisect_left(self.slots, slot)
+        if position < len(self.slots) and self.slots[position] == slot:
+            del self.slots[position]
+            del self.term_frequencies[position]
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+
+class Bm25Index:
+    """
+    In-memory inverted index scored with Okapi BM25.
+
+    Documents are addressed by integer slots handed out in increasing order, which keeps every posting list sorted
+    and lets documents be added or removed one at a time without rebuilding the index.
+    Slots of removed documents are reclaimed by compact().
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self._k1 = k1
+        self._b = b
+        self._postings: typing.Dict[str, _PostingList] = {}
+        self._document_lengths = array.array("f")
+        self._total_document_length = 0.0
+        self._number_of_documents = 0
+
+    @property
+    def number_of_documents(self) -> int:
+        return self._number_of_documents
+
+    def add(self, slot: int, text: str):
+        if slot < len(self._document_lengths):
+            raise ValueError(f"Slot {slot} was already used, slots must be added in increasing order")
+        tokens = tokenize(text)
+        term_frequencies: typing.Dict[str, int] = {}
+        for token in tokens:
+            term_frequencies[token] = term_frequencies.get(token, 0) + 1
+        for term, term_frequency in term_frequencies.items():
+            self._postings.setdefault(term, _PostingList()).append(slot=slot, term_frequency=term_frequency)
+
+        while len(self._document_lengths) < slot:
+            self._document_lengths.append(0.0)
+        self._document_lengths.append(len(tokens))
+        self._total_document_length += len(tokens)
+        self._number_of_documents += 1
+
+    def remove(self, slot: int, text: str):
+        """
+        Removes a document given the text it was indexed with, so only the posting lists of its own terms are touched.
+        """
+        for term in set(tokenize(text)):
+            posting_list = self._postings.get(term)
+            if posting_list is None:
+                continue
+            posting_list.remove(slot=slot)
+            if len(posting_list) == 0:
+                del self._postings[term]
+        self._total_document_length -= self._document_lengths[slot]
+        self._document_lengths[slot] = 0.0
+        self._number_of_documents -= 1
+
+    def compact(self, live_slots: np.ndarray):
+        """
+        Renumbers the given slots, sorted and covering every indexed document, to 0..len(live_slots) - 1.
+        The renumbering keeps slots in order, so posting lists stay sorted and no text is tokenized again.
+        """
+        for posting_list in self._postings.values():
+            new_slots = np.searchsorted(live_slots, np.frombuffer(posting_list.slots, dtype=np.uint32))
+            posting_list.slots = array.array("I", new_slots.astype(np.uint32).tobytes())
+        document_lengths = np.frombuffer(self._document_lengths, dtype=np.float32)[live_slots]
+        self._document_lengths = array.array("f", document_lengths.tobytes())
+
+    def search(self, query_text: str, number_of_results: int) -> RankedSlots:
+        slots, scores = self.score(query_text=query_text)
+        return select_top_k(slots=slots, scores=scores, k=number_of_results)
+
+    def score(self, query_text: str) -> RankedSlots:
+        """
+        Returns the slots matching at least one query term and their BM25 scores.
+        """
+        query_terms = [term for term in set(tokenize(query_text)) if term in self._postings]
+        if len(query_terms) == 0 or self._number_of_documents == 0:
+            return np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.float32)
+
+        document_lengths = np.frombuffer(self._document_lengths, dtype=np.float32)
+        average_document_length = max(self._total_document_length / self._number_of_documents, 1e-9)
+        # Only posting entries are touched, so a query costs the length of its posting lists, not of the corpus.
+        term_slots = []
+        term_scores = []
+        for term in query_terms:
+            posting_list = self._postings[term]
+            slots = np.frombuffer(posting_list.slots, dtype=np.uint32)
+            term_frequencies = np.frombuffer(posting_list.term_frequencies, dtype=np.float32)
+            document_frequency = len(posting_list)
+            inverse_document_frequency = math.log(
+                1 + (self._number_of_documents - document_frequency + 0.5) / (document_frequency + 0.5)
+            )
+            length_normalization = self._k1 * (1 - self._b + self._b * document_lengths[slots] / average_document_length)
+            term_slots.append(slots)
+            term_scores.append(inverse_document_frequency * term_frequencies * (self._k1 + 1) / (
+                    term_frequencies + length_normalization
+            ))
+
+        matched_slots, positions = np.unique(np.concatenate(term_slots), return_inverse=True)
+        scores = np.bincount(positions, weights=np.concatenate(term_scores), minlength=len(matched_slots))
+        return matched_slots.astype(np.uint32), scores.astype(np.float32)
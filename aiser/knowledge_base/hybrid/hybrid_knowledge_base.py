@@ -0,0 +1,161 @@
+import typing
+
+import numpy as np
+
+from ..knowledge_base import KnowledgeBase
+from ..semantic_search_result import SemanticSearchResult
+from .bm25_index import Bm25Index
+from .ranking import RankedSlots, fuse_by_reciprocal_rank, fuse_by_weight, select_top_k
+from .vector_index import VectorIndex, Float32VectorIndex
+
+Embedding = typing.Sequence[float]
+EmbeddingFunction = typing.Callable[[typing.List[str]], typing.Sequence[Embedding]]
+
+# Below this many slots of removed documents, compacting would cost more than the memory it frees.
+_MIN_DEAD_SLOTS_FOR_COMPACTION = 1024
+
+
+class ScoreFusion:
+    RECIPROCAL_RANK = 'reciprocal_rank'
+    WEIGHTED = 'weighted'
+
+
+class HybridKnowledgeBase(KnowledgeBase):
+    """
+    Knowledge base that combines BM25 lexical search with embedding search, so exact identifiers and rare terms
+    are found even when their embeddings are not close to the query.
+
+    Each retriever proposes its best candidates and the two rankings are fused into one list of results.
+    Documents can be added, replaced and removed one at a time. Once removed or replaced documents make up
+    more than compaction_dead_slot_share of all slots, the indexes are compacted in place.
+    Embeddings are kept as float32 unless a quantized vector_index is given to reduce memory.
+    """
+
+    def __init__(
+            self,
+            knowledge_base_id: str,
+            embed_texts: EmbeddingFunction,
+            score_fusion: str = ScoreFusion.RECIPROCAL_RANK,
+            lexical_weight: float = 0.5,
+            candidate_pool_size: int = 100,
+            reciprocal_rank_constant: float = 60,
+            bm25_k1: float = 1.2,
+            bm25_b: float = 0.75,
+            vector_index: typing.Optional[VectorIndex] = None,
+            compaction_dead_slot_share: float = 0.5,
+    ):
+        super().__init__(knowledge_base_id=knowledge_base_id)
+        if score_fusion not in (ScoreFusion.RECIPROCAL_RANK, ScoreFusion.WEIGHTED):
+            raise ValueError(f"Unknown score fusion: {score_fusion}")
+        self._embed_texts = embed_texts
+        self._score_fusion = score_fusion
+        self._lexical_weight = lexical_weight
+        self._candidate_pool_size = candidate_pool_size
+        self._reciprocal_rank_constant = reciprocal_rank_constant
+        self._lexical_index = Bm25Index(k1=bm25_k1, b=bm25_b)
+        self._vector_index = vector_index or Float32VectorIndex()
+        self._slot_by_document_id: typing.Dict[str, int] = {}
+        self._content_by_slot: typing.Dict[int, str] = {}
+        self._next_slot = 0
+        self._compaction_dead_slot_share = compaction_dead_slot_share
+
+    def __len__(self) -> int:
+        return len(self._slot_by_document_id)
+
+    def upsert_documents(
+            self,
+            documents: typing.Dict[str, str],
+            embeddings: typing.Optional[typing.Sequence[Embedding]] = None
+    ):
+        """
+        Adds documents by id, replacing any document that already has the same id.
+        Embeddings are computed with embed_texts when they are not given.
+        """
+        document_ids = list(documents.keys())
+        contents = [documents[document_id] for document_id in document_ids]
+        if embeddings is None:
+            embeddings = self._embed_texts(contents) if len(contents) > 0 else []
+        if len(embeddings) != len(contents):
+            raise ValueError("Expected one embedding per document")
+        for document_id, content, embedding in zip(document_ids, contents, embeddings):
+            slot = self._next_slot
+            self._vector_index.add(slot=slot, embedding=embedding)
+            self._next_slot += 1
+            self._remove_document_from_indexes(document_id=document_id)
+            self._lexical_index.add(slot=slot, text=content)
+            self._slot_by_document_id[document_id] = slot
+            self._content_by_slot[slot] = content
+        self._compact_if_needed()
+
+    def upsert_document(self, document_id: str, content: str, embedding: typing.Optional[Embedding] = None):
+        self.upsert_documents(
+            documents={document_id: content},
+            embeddings=None if embedding is None else [embedding]
+        )
+
+    def remove_document(self, document_id: str) -> bool:
+        was_removed = self._remove_document_from_indexes(document_id=document_id)
+        self._compact_if_needed()
+        return was_removed
+
+    async def shutdown(self):
+        self._vector_index.close()
+
+    def perform_semantic_search(
+            self,
+            query_text: str,
+            desired_number_of_results: int
+    ) -> typing.List[SemanticSearchResult]:
+        if desired_number_of_results <= 0 or len(self) == 0:
+            return []
+        number_of_candidates = max(self._candidate_pool_size, desired_number_of_results)
+        lexical_ranking = self._lexical_index.search(query_text=query_text, number_of_results=number_of_candidates)
+        query_embedding = self._embed_texts([query_text])[0]
+        vector_ranking = self._vector_index.search(
+            query_embedding=query_embedding,
+            number_of_results=number_of_candidates
+        )
+        slots, scores = select_top_k(*self._fuse(lexical_ranking, vector_ranking), k=desired_number_of_results)
+        return [
+            SemanticSearchResult(content=self._content_by_slot[int(slot)], score=float(score))
+            for slot, score in zip(slots, scores)
+        ]
+
+    def _remove_document_from_indexes(self, document_id: str) -> bool:
+        slot = self._slot_by_document_id.pop(document_id, None)
+        if slot is None:
+            return False
+        content = self._content_by_slot.pop(slot)
+        self._lexical_index.remove(slot=slot, text=content)
+        self._vector_index.remove(slot=slot)
+        return True
+
+    def _compact_if_needed(self):
+        number_of_dead_slots = self._next_slot - len(self)
+        if (number_of_dead_slots < _MIN_DEAD_SLOTS_FOR_COMPACTION
+                or number_of_dead_slots <= self._compaction_dead_slot_share * self._next_slot):
+            return
+        live_slots = np.array(sorted(self._content_by_slot.keys()), dtype=np.uint32)
+        self._lexical_index.compact(live_slots=live_slots)
+        self._vector_index.compact(live_slots=live_slots)
+        new_slot_by_old_slot = {int(old_slot): new_slot for new_slot, old_slot in enumerate(live_slots)}
+        self._slot_by_document_id = {
+            document_id: new_slot_by_old_slot[slot]
+            for document_id, slot in self._slot_by_document_id.items()
+        }
+        self._content_by_slot = {
+            new_slot_by_old_slot[slot]: content
+            for slot, content in self._content_by_slot.items()
+        }
+        self._next_slot = len(live_slots)
+
+    def _fuse(self, lexical_ranking: RankedSlots, vector_ranking: RankedSlots) -> RankedSlots:
+        if self._score_fusion == ScoreFusion.WEIGHTED:
+            return fuse_by_weight(
+                rankings=[lexical_ranking, vector_ranking],
+                weights=[self._lexical_weight, 1 - self._lexical_weight]
+            )
+        return fuse_by_reciprocal_rank(
+            rankings=[lexical_ranking, vector_ranking],
+            constant=self._reciprocal_rank_constant
+        )
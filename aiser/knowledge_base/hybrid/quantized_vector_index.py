@@ -0,0 +1,344 @@
+import tempfile
+import typing
+from abc import abstractmethod
+
+import numpy as np
+
+from .ranking import RankedSlots, select_top_k
+from .vector_index import VectorIndex, normalize, check_dimension, grown_capacity, grown_rows
+
+# Codes are widened to float32 one block at a time, small enough for the block to stay in cache.
+_SCORING_BLOCK_SIZE = 2048
+
+
+class DiskVectorStore:
+    """
+    Full precision float32 vectors kept in a memory mapped temporary file, so they do not count against RAM
+    and only the rows that are read back get paged in.
+    """
+
+    def __init__(self, dimension: int, initial_capacity: int, directory: typing.Optional[str] = None):
+        self._dimension = dimension
+        self._file = tempfile.TemporaryFile(dir=directory)
+        self._vectors: typing.Optional[np.memmap] = None
+        self._map(capacity=initial_capacity)
+
+    def __len__(self) -> int:
+        return len(self._vectors)
+
+    def write(self, slot: int, vector: np.ndarray):
+        if slot >= len(self._vectors):
+            self._map(capacity=grown_capacity(current_capacity=len(self._vectors), required_capacity=slot + 1))
+        self._vectors[slot] = vector
+
+    def read(self, slots: np.ndarray) -> np.ndarray:
+        return np.asarray(self._vectors[slots])
+
+    def compact(self, live_slots: np.ndarray, capacity: int):
+        # Rows only move to lower slots, so copying block by block in order never overwrites a row still to be read.
+        for block_start in range(0, len(live_slots), _SCORING_BLOCK_SIZE):
+            block_end = min(block_start + _SCORING_BLOCK_SIZE, len(live_slots))
+            self._vectors[block_start:block_end] = self._vectors[live_slots[block_start:block_end]]
+        self._vectors.flush()
+        self._vectors = None
+        self._map(capacity=capacity)
+
+    def close(self):
+        self._vectors = None
+        self._file.close()
+
+    def _map(self, capacity: int):
+        self._file.truncate(capacity * self._dimension * np.dtype(np.float32).itemsize)
+        self._vectors = np.memmap(self._file, dtype=np.float32, mode="r+", shape=(capacity, self._dimension))
+
+
+class QuantizedVectorIndex(VectorIndex):
+    """
+    Vector index that keeps only compact codes in RAM and scores every candidate on them.
+
+    With a positive rerank_factor, the full precision vectors are also written to a DiskVectorStore and the best
+    number_of_results * rerank_factor candidates are re-scored exactly before the final top results are picked.
+    """
+
+    def __init__(
+            self,
+            rerank_factor: int = 4,
+            rerank_directory: typing.Optional[str] = None,
+            initial_capacity: int = 1024
+    ):
+        self._rerank_factor = rerank_factor
+        self._rerank_directory = rerank_directory
+        self._initial_capacity = initial_capacity
+        self._dimension: typing.Optional[int] = None
+        self._is_occupied = np.zeros(0, dtype=bool)
+        self._full_precision_store: typing.Optional[DiskVectorStore] = None
+
+    @property
+    def dimension(self) -> typing.Optional[int]:
+        return self._dimension
+
+    def add(self, slot: int, embedding: typing.Sequence[float]):
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        if self._dimension is None:
+            self._initialize(dimension=len(vector))
+        check_dimension(vector=vector, dimension=self._dimension)
+        vector = normalize(vector)
+        if slot >= len(self._is_occupied):
+            self._grow(capacity=grown_capacity(current_capacity=len(self._is_occupied), required_capacity=slot + 1))
+        self._encode(slot=slot, vector=vector)
+        self._is_occupied[slot] = True
+        if self._full_precision_store is not None:
+            self._full_precision_store.write(slot=slot, vector=vector)
+
+    def remove(self, slot: int):
+        if slot < len(self._is_occupied):
+            self._is_occupied[slot] = False
+
+    def search(self, query_embedding: typing.Sequence[float], number_of_results: int) -> RankedSlots:
+        occupied_slots = np.flatnonzero(self._is_occupied).astype(np.uint32)
+        if len(occupied_slots) == 0:
+            return occupied_slots, np.empty(0, dtype=np.float32)
+        query = normalize(np.asarray(query_embedding, dtype=np.float32).reshape(-1))
+
+        number_of_scored_rows = int(occupied_slots[-1]) + 1
+        approximate_scores = np.empty(number_of_scored_rows, dtype=np.float32)
+        prepared_query = self._prepare_query(query=query)
+        for block_start in range(0, number_of_scored_rows, _SCORING_BLOCK_SIZE):
+            block_end = min(block_start + _SCORING_BLOCK_SIZE, number_of_scored_rows)
+            approximate_scores[block_start:block_end] = self._score_codes(
+                prepared_query=prepared_query,
+                block_start=block_start,
+                block_end=block_end
+            )
+
+        if self._full_precision_store is None:
+            return select_top_k(slots=occupied_slots, scores=approximate_scores[occupied_slots], k=number_of_results)
+
+        candidate_slots, _ = select_top_k(
+            slots=occupied_slots,
+            scores=approximate_scores[occupied_slots],
+            k=number_of_results * self._rerank_factor
+        )
+        exact_scores = self._full_precision_store.read(candidate_slots) @ query
+        return select_top_k(slots=candidate_slots, scores=exact_scores, k=number_of_results)
+
+    def compact(self, live_slots: np.ndarray):
+        if self._dimension is None:
+            return
+        capacity = max(self._initial_capacity, len(live_slots))
+        self._is_occupied = grown_rows(rows=self._is_occupied[live_slots], capacity=capacity)
+        self._compact_codes(live_slots=live_slots, capacity=capacity)
+        if self._full_precision_store is not None:
+            self._full_precision_store.compact(live_slots=live_slots, capacity=capacity)
+
+    def close(self):
+        if self._full_precision_store is not None:
+            self._full_precision_store.close()
+            self._full_precision_store = None
+
+    def _initialize(self, dimension: int):
+        self._dimension = dimension
+        self._is_occupied = np.zeros(self._initial_capacity, dtype=bool)
+        self._allocate_codes(capacity=self._initial_capacity)
+        if self._rerank_factor > 0:
+            self._full_precision_store = DiskVectorStore(
+                dimension=dimension,
+                initial_capacity=self._initial_capacity,
+                directory=self._rerank_directory
+            )
+
+    def _grow(self, capacity: int):
+        self._is_occupied = grown_rows(rows=self._is_occupied, capacity=capacity)
+        self._grow_codes(capacity=capacity)
+
+    @abstractmethod
+    def _allocate_codes(self, capacity: int):
+        raise NotImplementedError
+
+    @abstractmethod
+    def _grow_codes(self, capacity: int):
+        raise NotImplementedError
+
+    @abstractmethod
+    def _compact_codes(self, live_slots: np.ndarray, capacity: int):
+        raise NotImplementedError
+
+    @abstractmethod
+    def _encode(self, slot: int, vector: np.ndarray):
+        raise NotImplementedError
+
+    @abstractmethod
+    def _prepare_query(self, query: np.ndarray) -> np.ndarray:
+        """
+        Turns the normalized query into whatever _score_codes needs, once per search rather than once per block.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def _score_codes(self, prepared_query: np.ndarray, block_start: int, block_end: int) -> np.ndarray:
+        raise NotImplementedError
+
+
+class Int8VectorIndex(QuantizedVectorIndex):
+    """
+    Scalar quantization: every component becomes a signed byte, scaled per vector by its largest component.
+    Takes a quarter of the memory of float32 embeddings, plus four bytes per vector for the scale.
+    """
+
+    def __init__(
+            self,
+            rerank_factor: int = 4,
+            rerank_directory: typing.Optional[str] = None,
+            initial_capacity: int = 1024
+    ):
+        super().__init__(
+            rerank_factor=rerank_factor,
+            rerank_directory=rerank_directory,
+            initial_capacity=initial_capacity
+        )
+        self._codes = np.zeros((0, 0), dtype=np.int8)
+        self._scales = np.zeros(0, dtype=np.float32)
+
+    def memory_usage_in_bytes(self) -> int:
+        return self._codes.nbytes + self._scales.nbytes + self._is_occupied.nbytes
+
+    def _allocate_codes(self, capacity: int):
+        self._codes = np.zeros((capacity, self._dimension), dtype=np.int8)
+        self._scales = np.zeros(capacity, dtype=np.float32)
+
+    def _grow_codes(self, capacity: int):
+        self._codes = grown_rows(rows=self._codes, capacity=capacity)
+        self._scales = grown_rows(rows=self._scales, capacity=capacity)
+
+    def _compact_codes(self, live_slots: np.ndarray, capacity: int):
+        self._codes = grown_rows(rows=self._codes[live_slots], capacity=capacity)
+        self._scales = grown_rows(rows=self._scales[live_slots], capacity=capacity)
+
+    def _encode(self, slot: int, vector: np.ndarray):
+        largest_component = float(np.abs(vector).max())
+        scale = largest_component / 127 if largest_component > 0 else 1.0
+        self._codes[slot] = np.round(vector / scale).astype(np.int8)
+        self._scales[slot] = scale
+
+    def _prepare_query(self, query: np.ndarray) -> np.ndarray:
+        return query
+
+    def _score_codes(self, prepared_query: np.ndarray, block_start: int, block_end: int) -> np.ndarray:
+        codes = self._codes[block_start:block_end].astype(np.float32)
+        return (codes @ prepared_query) * self._scales[block_start:block_end]
+
+
+class ProductQuantizedVectorIndex(QuantizedVectorIndex):
+    """
+    Product quantization: embeddings are split into number_of_subspaces parts and every part is replaced by the
+    id of its nearest centroid, so a vector takes number_of_subspaces bytes.
+    Queries are scored through a table of query-to-centroid products, without decoding any vector.
+
+    The centroids have to be learned with train() on a representative sample before any embedding is added.
+    """
+
+    def __init__(
+            self,
+            number_of_subspaces: int = 16,
+            number_of_centroids: int = 256,
+            training_iterations: int = 10,
+            seed: int = 0,
+            rerank_factor: int = 32,
+            rerank_directory: typing.Optional[str] = None,
+            initial_capacity: int = 1024
+    ):
+        super().__init__(
+            rerank_factor=rerank_factor,
+            rerank_directory=rerank_directory,
+            initial_capacity=initial_capacity
+        )
+        if not 0 < number_of_centroids <= 256:
+            raise ValueError("The number of centroids must be between 1 and 256 so codes fit in one byte")
+        self._number_of_subspaces = number_of_subspaces
+        self._number_of_centroids = number_of_centroids
+        self._training_iterations = training_iterations
+        self._random_generator = np.random.default_rng(seed)
+        self._centroids: typing.Optional[np.ndarray] = None
+        self._centroid_squared_norms: typing.Optional[np.ndarray] = None
+        self._codes = np.zeros((0, number_of_subspaces), dtype=np.uint8)
+
+    @property
+    def is_trained(self) -> bool:
+        return self._centroids is not None
+
+    def train(self, embeddings: typing.Sequence[typing.Sequence[float]]):
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) == 0:
+            raise ValueError("Training requires a non-empty list of embeddings")
+        if vectors.shape[1] % self._number_of_subspaces != 0:
+            raise ValueError(
+                f"The dimension {vectors.shape[1]} is not divisible by {self._number_of_subspaces} subspaces"
+            )
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms > 0, norms, 1)
+        subvectors = vectors.reshape(len(vectors), self._number_of_subspaces, -1)
+        self._centroids = np.stack([
+            self._run_k_means(points=subvectors[:, subspace])
+            for subspace in range(self._number_of_subspaces)
+        ])
+        self._centroid_squared_norms = (self._centroids ** 2).sum(axis=2)
+
+    def memory_usage_in_bytes(self) -> int:
+        centroids_bytes = 0 if self._centroids is None else self._centroids.nbytes
+        return self._codes.nbytes + self._is_occupied.nbytes + centroids_bytes
+
+    def _initialize(self, dimension: int):
+        if not self.is_trained:
+            raise RuntimeError("The index has to be trained before embeddings are added")
+        if dimension != self._centroids.shape[0] * self._centroids.shape[2]:
+            raise ValueError(f"The index was trained on embeddings of another dimension than {dimension}")
+        super()._initialize(dimension=dimension)
+
+    def _allocate_codes(self, capacity: int):
+        self._codes = np.zeros((capacity, self._number_of_subspaces), dtype=np.uint8)
+
+    def _grow_codes(self, capacity: int):
+        self._codes = grown_rows(rows=self._codes, capacity=capacity)
+
+    def _compact_codes(self, live_slots: np.ndarray, capacity: int):
+        self._codes = grown_rows(rows=self._codes[live_slots], capacity=capacity)
+
+    def _encode(self, slot: int, vector: np.ndarray):
+        subvectors = vector.reshape(self._number_of_subspaces, -1)
+        # The squared distance to a centroid, minus the squared norm of the subvector, which is the same for all.
+        centroid_products = np.einsum("mkd,md->mk", self._centroids, subvectors)
+        partial_squared_distances = self._centroid_squared_norms - 2 * centroid_products
+        self._codes[slot] = partial_squared_distances.argmin(axis=1)
+
+    def _prepare_query(self, query: np.ndarray) -> np.ndarray:
+        # Lookup table of the product of every query subvector with every centroid of its subspace.
+        return np.einsum("mkd,md->mk", self._centroids, query.reshape(self._number_of_subspaces, -1))
+
+    def _score_codes(self, prepared_query: np.ndarray, block_start: int, block_end: int) -> np.ndarray:
+        codes = self._codes[block_start:block_end]
+        scores = np.zeros(len(codes), dtype=np.float32)
+        for subspace in range(self._number_of_subspaces):
+            scores += prepared_query[subspace][codes[:, subspace]]
+        return scores
+
+    def _run_k_means(self, points: np.ndarray) -> np.ndarray:
+        number_of_centroids = min(self._number_of_centroids, len(points))
+        initial_positions = self._random_generator.choice(len(points), size=number_of_centroids, replace=False)
+        centroids = points[initial_positions].copy()
+        for _ in range(self._training_iterations):
+            squared_distances = (
+                    (points ** 2).sum(axis=1, keepdims=True)
+                    - 2 * points @ centroids.T
+                    + (centroids ** 2).sum(axis=1)
+            )
+            assignments = squared_distances.argmin(axis=1)
+            one_hot_assignments = np.zeros((len(points), number_of_centroids), dtype=np.float32)
+            one_hot_assignments[np.arange(len(points)), assignments] = 1
+            counts = one_hot_assignments.sum(axis=0)
+            sums = one_hot_assignments.T @ points
+            is_populated = counts > 0
+            centroids[is_populated] = sums[is_populated] / counts[is_populated, None]
+        if number_of_centroids < self._number_of_centroids:
+            padding = np.zeros((self._number_of_centroids - number_of_centroids, points.shape[1]), dtype=np.float32)
+            centroids = np.concatenate([centroids, padding])
+        return centroids.astype(np.float32)
@@ -0,0 +1,58 @@
+import typing
+
+import numpy as np
+
+RankedSlots = typing.Tuple[np.ndarray, np.ndarray]
+
+
+def select_top_k(slots: np.ndarray, scores: np.ndarray, k: int) -> RankedSlots:
+    """
+    Returns the k best slots and their scores, best first, without sorting the whole candidate list.
+    """
+    if k <= 0 or len(slots) == 0:
+        return slots[:0], scores[:0]
+    if k < len(scores):
+        best_positions = np.argpartition(-scores, k - 1)[:k]
+        slots, scores = slots[best_positions], scores[best_positions]
+    order = np.argsort(-scores, kind="stable")
+    return slots[order], scores[order]
+
+
+def fuse_by_reciprocal_rank(rankings: typing.Sequence[RankedSlots], constant: float = 60) -> RankedSlots:
+    """
+    Reciprocal rank fusion: each ranking contributes 1 / (constant + rank) for every slot it contains.
+    """
+    contributions = [
+        1.0 / (constant + np.arange(1, len(slots) + 1, dtype=np.float64))
+        for slots, _ in rankings
+    ]
+    return _sum_contributions(rankings=rankings, contributions=contributions)
+
+
+def fuse_by_weight(rankings: typing.Sequence[RankedSlots], weights: typing.Sequence[float]) -> RankedSlots:
+    """
+    Weighted sum of scores that are min-max normalized per ranking, so scores of different scales can be combined.
+    A slot missing from a ranking gets nothing from it.
+    """
+    contributions = []
+    for (_, scores), weight in zip(rankings, weights):
+        scores = scores.astype(np.float64)
+        if len(scores) == 0:
+            contributions.append(scores)
+            continue
+        score_range = scores.max() - scores.min()
+        normalized = (scores - scores.min()) / score_range if score_range > 0 else np.ones_like(scores)
+        contributions.append(weight * normalized)
+    return _sum_contributions(rankings=rankings, contributions=contributions)
+
+
+def _sum_contributions(
+        rankings: typing.Sequence[RankedSlots],
+        contributions: typing.Sequence[np.ndarray]
+) -> RankedSlots:
+    all_slots = np.concatenate([slots for slots, _ in rankings]) if len(rankings) > 0 else np.empty(0)
+    if len(all_slots) == 0:
+        return all_slots.astype(np.uint32), np.empty(0, dtype=np.float64)
+    fused_slots, positions = np.unique(all_slots, return_inverse=True)
+    fused_scores = np.bincount(positions, weights=np.concatenate(contributions), minlength=len(fused_slots))
+    return fused_slots, fused_scores
@@ -0,0 +1,129 @@
+import typing
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from .ranking import RankedSlots, select_top_k
+
+
+class VectorIndex(ABC):
+    """
+    Embeddings addressed by the same slots as the lexical index, searched by cosine similarity.
+    """
+
+    @property
+    @abstractmethod
+    def dimension(self) -> typing.Optional[int]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def add(self, slot: int, embedding: typing.Sequence[float]):
+        raise NotImplementedError
+
+    @abstractmethod
+    def remove(self, slot: int):
+        raise NotImplementedError
+
+    @abstractmethod
+    def search(self, query_embedding: typing.Sequence[float], number_of_results: int) -> RankedSlots:
+        raise NotImplementedError
+
+    @abstractmethod
+    def compact(self, live_slots: np.ndarray):
+        """
+        Moves the rows of the given slots, sorted and covering every stored embedding, to slots
+        0..len(live_slots) - 1 and releases the rest.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def memory_usage_in_bytes(self) -> int:
+        """
+        Bytes of RAM held by the index, excluding anything it keeps on disk.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def close(self):
+        """
+        Releases files or other resources held outside of RAM.
+        """
+        raise NotImplementedError
+
+
+class Float32VectorIndex(VectorIndex):
+    """
+    Embeddings stored as unit length float32 rows of one matrix, so cosine similarity is a single matrix product.
+    Rows grow by doubling when documents are added.
+    """
+
+    def __init__(self, initial_capacity: int = 1024):
+        self._initial_capacity = initial_capacity
+        self._embeddings: typing.Optional[np.ndarray] = None
+        self._is_occupied = np.zeros(0, dtype=bool)
+
+    @property
+    def dimension(self) -> typing.Optional[int]:
+        return None if self._embeddings is None else self._embeddings.shape[1]
+
+    def add(self, slot: int, embedding: typing.Sequence[float]):
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        if self._embeddings is None:
+            self._embeddings = np.zeros((self._initial_capacity, len(vector)), dtype=np.float32)
+            self._is_occupied = np.zeros(self._initial_capacity, dtype=bool)
+        check_dimension(vector=vector, dimension=self.dimension)
+        if slot >= len(self._is_occupied):
+            new_capacity = grown_capacity(current_capacity=len(self._is_occupied), required_capacity=slot + 1)
+            self._embeddings = grown_rows(rows=self._embeddings, capacity=new_capacity)
+            self._is_occupied = grown_rows(rows=self._is_occupied, capacity=new_capacity)
+        self._embeddings[slot] = normalize(vector)
+        self._is_occupied[slot] = True
+
+    def remove(self, slot: int):
+        if slot < len(self._is_occupied):
+            self._is_occupied[slot] = False
+            self._embeddings[slot] = 0
+
+    def search(self, query_embedding: typing.Sequence[float], number_of_results: int) -> RankedSlots:
+        if self._embeddings is None:
+            return np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.float32)
+        query = normalize(np.asarray(query_embedding, dtype=np.float32).reshape(-1))
+        occupied_slots = np.flatnonzero(self._is_occupied).astype(np.uint32)
+        if len(occupied_slots) == 0:
+            return occupied_slots, np.empty(0, dtype=np.float32)
+        scores = (self._embeddings[:int(occupied_slots[-1]) + 1] @ query)[occupied_slots]
+        return select_top_k(slots=occupied_slots, scores=scores, k=number_of_results)
+
+    def compact(self, live_slots: np.ndarray):
+        if self._embeddings is None:
+            return
+        capacity = max(self._initial_capacity, len(live_slots))
+        self._embeddings = grown_rows(rows=self._embeddings[live_slots], capacity=capacity)
+        self._is_occupied = grown_rows(rows=self._is_occupied[live_slots], capacity=capacity)
+
+    def memory_usage_in_bytes(self) -> int:
+        embeddings_bytes = 0 if self._embeddings is None else self._embeddings.nbytes
+        return embeddings_bytes + self._is_occupied.nbytes
+
+    def close(self):
+        pass
+
+
+def normalize(vector: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+def check_dimension(vector: np.ndarray, dimension: typing.Optional[int]):
+    if len(vector) != dimension:
+        raise ValueError(f"Expected an embedding of dimension {dimension}, got {len(vector)}")
+
+
+def grown_capacity(current_capacity: int, required_capacity: int) -> int:
+    return max(required_capacity, 2 * current_capacity)
+
+
+def grown_rows(rows: np.ndarray, capacity: int) -> np.ndarray:
+    grown = np.zeros((capacity,) + rows.shape[1:], dtype=rows.dtype)
+    grown[:len(rows)] = rows
+    return grown
@@ -3,6 +3,7 @@ from abc import ABC, abstractmethod
 from typing import List
 
 from ..identifiable_entities import IdentifiableEntity
+from ..shared_resources import SharedResources
 from aiser.knowledge_base.semantic_search_result import SemanticSearchResult
 
 
@@ -10,6 +11,23 @@ class KnowledgeBase(IdentifiableEntity, ABC):
     def __init__(self, knowledge_base_id: str):
         super().__init__(entity_id=knowledge_base_id)
 
+    async def startup(self, resources: SharedResources):
+        """
+        Called once per server worker before any request is served.
+        Override it to load indexes or create clients that every search can reuse.
+        """
+        pass
+
+    async def shutdown(self):
+        """
+        Called once per server worker after the last request has been served.
+        """
+        pass
+
     @abstractmethod
     def perform_semantic_search(self, query_text: str, desired_number_of_results: int) -> List[SemanticSearchResult]:
+        """
+        May also be implemented as a coroutine, which lets the server handle other requests while the search
+        waits on I/O.
+        """
         raise NotImplementedError
@@ -0,0 +1,4 @@
+from .sharded_knowledge_base import ShardedKnowledgeBase, ShardedSearchResult, merge_top_results
+from .knowledge_base_shard import KnowledgeBaseShard, assign_shard
+from .process_knowledge_base_shard import ProcessKnowledgeBaseShard
+from .rest_knowledge_base_shard import RestKnowledgeBaseShard
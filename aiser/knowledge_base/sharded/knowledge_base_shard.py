@@ -0,0 +1,36 @@
+import typing
+import zlib
+from abc import ABC, abstractmethod
+
+from ...shared_resources import SharedResources
+from ..semantic_search_result import SemanticSearchResult
+
+
+class KnowledgeBaseShard(ABC):
+    """
+    One part of a sharded corpus, searched by a ShardedKnowledgeBase.
+    """
+
+    async def start(self, resources: SharedResources):
+        pass
+
+    async def stop(self):
+        pass
+
+    @abstractmethod
+    async def search(self, query_text: str, number_of_results: int) -> typing.List[SemanticSearchResult]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_name(self) -> str:
+        """
+        Tells this shard apart from the other shards of the same knowledge base, e.g. in unavailable_shards.
+        """
+        raise NotImplementedError
+
+
+def assign_shard(document_id: str, number_of_shards: int) -> int:
+    """
+    Stable assignment of a document to a shard, identical across processes and runs.
+    """
+    return zlib.crc32(document_id.encode("utf-8")) % number_of_shards
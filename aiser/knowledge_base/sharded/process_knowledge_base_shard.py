@@ -0,0 +1,127 @@
+import asyncio
+import concurrent.futures
+import concurrent.futures.process
+import inspect
+import multiprocessing.context
+import typing
+
+from ...shared_resources import SharedResources
+from ..knowledge_base import KnowledgeBase
+from ..semantic_search_result import SemanticSearchResult
+from .knowledge_base_shard import KnowledgeBaseShard
+
+KnowledgeBaseFactory = typing.Callable[..., KnowledgeBase]
+
+_shard_knowledge_base: typing.Optional[KnowledgeBase] = None
+
+
+def _load_shard_knowledge_base(
+        knowledge_base_factory: KnowledgeBaseFactory,
+        factory_kwargs: typing.Dict[str, typing.Any]
+):
+    global _shard_knowledge_base
+    _shard_knowledge_base = knowledge_base_factory(**factory_kwargs)
+
+
+def _search_shard_knowledge_base(query_text: str, number_of_results: int) -> typing.List[SemanticSearchResult]:
+    if _shard_knowledge_base is None:
+        raise RuntimeError("Shard knowledge base is not loaded")
+    results = _shard_knowledge_base.perform_semantic_search(
+        query_text=query_text,
+        desired_number_of_results=number_of_results
+    )
+    if inspect.isawaitable(results):
+        results = asyncio.run(results)
+    return results
+
+
+class ProcessKnowledgeBaseShard(KnowledgeBaseShard):
+    """
+    Shard served by a knowledge base living in its own local process, so shards search on separate cores.
+
+    The knowledge base is built inside that process by calling knowledge_base_factory(**factory_kwargs),
+    so both must be picklable. Loading happens in start(), so a failing factory fails startup and searches never
+    wait for the corpus to load. Each shard process handles one search at a time. A search that timed out keeps
+    running in the process, so until it finishes, new searches fail at once instead of queueing behind it.
+    If the process dies, the searches in flight fail and a new process is started, which loads the knowledge base
+    again; searches fail at once until it has.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            knowledge_base_factory: KnowledgeBaseFactory,
+            factory_kwargs: typing.Optional[typing.Dict[str, typing.Any]] = None,
+            mp_context: typing.Optional[multiprocessing.context.BaseContext] = None
+    ):
+        self._name = name
+        self._knowledge_base_factory = knowledge_base_factory
+        self._factory_kwargs = factory_kwargs or {}
+        self._mp_context = mp_context
+        self._executor: typing.Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self._abandoned_searches: typing.List[concurrent.futures.Future] = []
+        self._reload: typing.Optional[concurrent.futures.Future] = None
+
+    async def start(self, resources: SharedResources):
+        if self._executor is not None:
+            return
+        executor, load = self._create_executor()
+        try:
+            await asyncio.wrap_future(load)
+        except BaseException:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        self._executor = executor
+
+    async def stop(self):
+        if self._executor is None:
+            return
+        executor, self._executor = self._executor, None
+        await asyncio.get_running_loop().run_in_executor(
+            None,
+            lambda: executor.shutdown(wait=True, cancel_futures=True)
+        )
+
+    async def search(self, query_text: str, number_of_results: int) -> typing.List[SemanticSearchResult]:
+        if self._executor is None:
+            raise RuntimeError("Shard is not started")
+        self._abandoned_searches = [future for future in self._abandoned_searches if not future.done()]
+        if len(self._abandoned_searches) > 0:
+            raise RuntimeError("Shard is still busy with a search that was given up on")
+        if self._reload is not None and not self._reload.done():
+            raise RuntimeError("Shard is still reloading its knowledge base after its process died")
+        executor = self._executor
+        future: typing.Optional[concurrent.futures.Future] = None
+        try:
+            future = executor.submit(_search_shard_knowledge_base, query_text, number_of_results)
+            return await asyncio.wrap_future(future)
+        except concurrent.futures.process.BrokenProcessPool:
+            self._replace_broken_executor(broken_executor=executor)
+            raise
+        except asyncio.CancelledError:
+            # Queued searches can still be cancelled, but one already running in the process can not.
+            if future is not None and not future.cancel():
+                self._abandoned_searches.append(future)
+            raise
+
+    def get_name(self) -> str:
+        return self._name
+
+    def _create_executor(self) -> typing.Tuple[concurrent.futures.ProcessPoolExecutor, concurrent.futures.Future]:
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=self._mp_context)
+        load = executor.submit(_load_shard_knowledge_base, self._knowledge_base_factory, self._factory_kwargs)
+        return executor, load
+
+    def _replace_broken_executor(self, broken_executor: concurrent.futures.ProcessPoolExecutor):
+        # Every search that was in flight lands here, but only the first one replaces the executor.
+        if self._executor is not broken_executor:
+            return
+        print(f"Process of shard {self._name} died, starting a new one")
+        broken_executor.shutdown(wait=False, cancel_futures=True)
+        self._executor, self._reload = self._create_executor()
+        self._reload.add_done_callback(self._report_failed_reload)
+        self._abandoned_searches = []
+
+    def _report_failed_reload(self, reload: concurrent.futures.Future):
+        if not reload.cancelled() and reload.exception() is not None:
+            print(f"Shard {self._name} failed to reload its knowledge base: {reload.exception()}")
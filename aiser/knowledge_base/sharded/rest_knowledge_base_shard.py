@@ -0,0 +1,46 @@
+import typing
+
+import httpx
+
+from ...shared_resources import SharedResources
+from ...models.dtos import SemanticSearchRequest, SemanticSearchResultResponseDto
+from ..semantic_search_result import SemanticSearchResult
+from .knowledge_base_shard import KnowledgeBaseShard
+
+
+class RestKnowledgeBaseShard(KnowledgeBaseShard):
+    """
+    Shard served by a knowledge base on another aiser node, queried through its semantic search endpoint.
+    Requests go through the pooled http client of the shared resources.
+    """
+
+    def __init__(
+            self,
+            server_url: str,
+            knowledge_base_id: str,
+            headers: typing.Optional[typing.Dict[str, str]] = None
+    ):
+        self._url = f"{server_url.rstrip('/')}/knowledge-base/{knowledge_base_id}/semantic-search"
+        self._headers = headers or {}
+        self._http_client: typing.Optional[httpx.AsyncClient] = None
+
+    async def start(self, resources: SharedResources):
+        self._http_client = resources.http_client
+
+    async def stop(self):
+        self._http_client = None
+
+    async def search(self, query_text: str, number_of_results: int) -> typing.List[SemanticSearchResult]:
+        if self._http_client is None:
+            raise RuntimeError("Shard is not started")
+        request = SemanticSearchRequest(text=query_text, numResults=number_of_results)
+        response = await self._http_client.post(self._url, json=request.model_dump(), headers=self._headers)
+        response.raise_for_status()
+        response_dto = SemanticSearchResultResponseDto(**response.json())
+        return [
+            SemanticSearchResult(content=result.content, score=result.score)
+            for result in response_dto.results
+        ]
+
+    def get_name(self) -> str:
+        return self._url
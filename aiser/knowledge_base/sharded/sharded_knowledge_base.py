@@ -0,0 +1,112 @@
+import asyncio
+import heapq
+import itertools
+import math
+import typing
+
+from pydantic import BaseModel
+
+from ...shared_resources import SharedResources
+from ..knowledge_base import KnowledgeBase
+from ..semantic_search_result import SemanticSearchResult
+from .knowledge_base_shard import KnowledgeBaseShard
+
+
+class ShardedSearchResult(BaseModel):
+    """
+    Merged results of a sharded search.
+
+    Attributes:
+        results (List[SemanticSearchResult]): The best results over all shards that answered, best first.
+        unavailable_shards (List[str]): Names of the shards that timed out or failed, so results may be partial.
+    """
+
+    results: typing.List[SemanticSearchResult]
+    unavailable_shards: typing.List[str]
+
+    @property
+    def is_partial(self) -> bool:
+        return len(self.unavailable_shards) > 0
+
+
+class ShardedKnowledgeBase(KnowledgeBase):
+    """
+    Knowledge base whose corpus is split across shards that are searched in parallel.
+
+    Every shard returns its own top results, which are merged into the overall top results.
+    A shard that does not answer within shard_timeout_in_seconds is left out, so a slow shard
+    degrades the results instead of delaying them.
+    """
+
+    def __init__(
+            self,
+            knowledge_base_id: str,
+            shards: typing.List[KnowledgeBaseShard],
+            shard_timeout_in_seconds: float = 2.0
+    ):
+        super().__init__(knowledge_base_id=knowledge_base_id)
+        if len(shards) == 0:
+            raise ValueError("At least one shard is required")
+        self._shards = shards
+        self._shard_timeout_in_seconds = shard_timeout_in_seconds
+
+    async def startup(self, resources: SharedResources):
+        await asyncio.gather(*[shard.start(resources=resources) for shard in self._shards])
+
+    async def shutdown(self):
+        await asyncio.gather(*[shard.stop() for shard in self._shards], return_exceptions=True)
+
+    async def perform_semantic_search(
+            self,
+            query_text: str,
+            desired_number_of_results: int
+    ) -> typing.List[SemanticSearchResult]:
+        sharded_search_result = await self.search_shards(
+            query_text=query_text,
+            desired_number_of_results=desired_number_of_results
+        )
+        if sharded_search_result.is_partial:
+            print(f"Partial results, unavailable shards: {', '.join(sharded_search_result.unavailable_shards)}")
+        return sharded_search_result.results
+
+    async def search_shards(self, query_text: str, desired_number_of_results: int) -> ShardedSearchResult:
+        shard_outcomes = await asyncio.gather(*[
+            asyncio.wait_for(
+                shard.search(query_text=query_text, number_of_results=desired_number_of_results),
+                timeout=self._shard_timeout_in_seconds
+            )
+            for shard in self._shards
+        ], return_exceptions=True)
+
+        shard_results: typing.List[typing.List[SemanticSearchResult]] = []
+        unavailable_shards: typing.List[str] = []
+        for shard, outcome in zip(self._shards, shard_outcomes):
+            if isinstance(outcome, BaseException):
+                unavailable_shards.append(shard.get_name())
+            else:
+                shard_results.append(outcome)
+
+        return ShardedSearchResult(
+            results=merge_top_results(
+                shard_results=shard_results,
+                desired_number_of_results=desired_number_of_results
+            ),
+            unavailable_shards=unavailable_shards
+        )
+
+
+def merge_top_results(
+        shard_results: typing.List[typing.List[SemanticSearchResult]],
+        desired_number_of_results: int
+) -> typing.List[SemanticSearchResult]:
+    """
+    Merges per-shard results with a heap. Shards are not trusted to return sorted results,
+    so each list is sorted first; results without a score rank last.
+    """
+
+    def score_of(result: SemanticSearchResult) -> float:
+        return -math.inf if result.score is None else result.score
+
+    sorted_shard_results = [sorted(results, key=score_of, reverse=True) for results in shard_results]
+    merged = heapq.merge(*sorted_shard_results, key=score_of, reverse=True)
+    return list(itertools.islice(merged, max(desired_number_of_results, 0)))
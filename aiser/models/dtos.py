@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, Field
+from typing import Annotated, List, Literal, Optional, Union
 
 
 class SemanticSearchRequest(BaseModel):
@@ -26,6 +26,17 @@ class AgentChatRequest(BaseModel):
 
 class AgentChatResponse(BaseModel):
     outputMessage: ChatMessageDto
+    streamId: Optional[str] = None
+    sequenceNumber: Optional[int] = None
+
+
+class AgentChatErrorResponse(BaseModel):
+    streamId: Optional[str] = None
+    detail: str
+
+
+class AgentChatResumeRequest(BaseModel):
+    fromSequenceNumber: int = Field(default=0, ge=0)
 
 
 class PublicKeyInfo(BaseModel):
@@ -35,3 +46,49 @@ class PublicKeyInfo(BaseModel):
 
 class VersionInfo(BaseModel):
     version: str
+
+
+MAX_AGENT_CHAT_STREAM_CREDIT = 65536
+
+
+class AgentChatStreamStartFrame(BaseModel):
+    type: Literal["start"] = "start"
+    streamId: str
+    agentId: str
+    messages: List[ChatMessageDto]
+    credit: int = Field(default=16, ge=0, le=MAX_AGENT_CHAT_STREAM_CREDIT)
+
+
+class AgentChatStreamCreditFrame(BaseModel):
+    type: Literal["credit"] = "credit"
+    streamId: str
+    amount: int = Field(gt=0, le=MAX_AGENT_CHAT_STREAM_CREDIT)
+
+
+class AgentChatStreamCancelFrame(BaseModel):
+    type: Literal["cancel"] = "cancel"
+    streamId: str
+
+
+AgentChatStreamClientFrame = Annotated[
+    Union[AgentChatStreamStartFrame, AgentChatStreamCreditFrame, AgentChatStreamCancelFrame],
+    Field(discriminator="type")
+]
+
+
+class AgentChatStreamMessageFrame(BaseModel):
+    type: Literal["message"] = "message"
+    streamId: str
+    outputMessage: ChatMessageDto
+
+
+class AgentChatStreamEndFrame(BaseModel):
+    type: Literal["end"] = "end"
+    streamId: str
+    cancelled: bool = False
+
+
+class AgentChatStreamErrorFrame(BaseModel):
+    type: Literal["error"] = "error"
+    streamId: Optional[str] = None
+    detail: str
@@ -0,0 +1 @@
+from .shared_resources import SharedResources
@@ -0,0 +1,95 @@
+import asyncio
+import inspect
+import typing
+
+import httpx
+
+T = typing.TypeVar("T")
+ResourceFactory = typing.Callable[[], typing.Union[T, typing.Awaitable[T]]]
+ResourceCloser = typing.Callable[[], typing.Union[None, typing.Awaitable[None]]]
+HttpClientFactory = typing.Callable[[], httpx.AsyncClient]
+
+
+def _make_default_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(limits=httpx.Limits(max_connections=100, max_keepalive_connections=20))
+
+
+async def _call_and_await_if_needed(function: typing.Callable[[], typing.Any]) -> typing.Any:
+    result = function()
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+class SharedResources:
+    """
+    Resources that live as long as a server worker and are shared by all of its agents and knowledge bases,
+    such as model clients, connection pools and loaded indexes.
+    A pooled http client is always available once the resources are opened.
+    """
+
+    def __init__(self, http_client_factory: typing.Optional[HttpClientFactory] = None):
+        self._http_client_factory = http_client_factory or _make_default_http_client
+        self._http_client: typing.Optional[httpx.AsyncClient] = None
+        self._resources: typing.Dict[str, typing.Any] = {}
+        self._closers: typing.List[ResourceCloser] = []
+        self._creation_locks: typing.Dict[str, asyncio.Lock] = {}
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        if self._http_client is None:
+            raise RuntimeError("Shared resources are not open")
+        return self._http_client
+
+    async def open(self):
+        if self._http_client is None:
+            self._http_client = self._http_client_factory()
+
+    async def close(self):
+        closers = list(reversed(self._closers))
+        self._closers = []
+        self._resources = {}
+        self._creation_locks = {}
+        errors: typing.List[Exception] = []
+        for closer in closers:
+            try:
+                await _call_and_await_if_needed(closer)
+            except Exception as error:
+                print(f"Closing a shared resource failed: {error}")
+                errors.append(error)
+        if self._http_client is not None:
+            http_client, self._http_client = self._http_client, None
+            try:
+                await http_client.aclose()
+            except Exception as error:
+                print(f"Closing the shared http client failed: {error}")
+                errors.append(error)
+        if len(errors) > 0:
+            raise errors[0]
+
+    def register(self, key: str, resource: T, close: typing.Optional[ResourceCloser] = None) -> T:
+        if key in self._resources:
+            raise KeyError(f"Resource already registered: {key}")
+        self._resources[key] = resource
+        if close is not None:
+            self._closers.append(close)
+        return resource
+
+    def get(self, key: str) -> typing.Any:
+        return self._resources[key]
+
+    async def get_or_create(
+            self,
+            key: str,
+            factory: ResourceFactory,
+            close: typing.Optional[typing.Callable[[T], typing.Union[None, typing.Awaitable[None]]]] = None
+    ) -> T:
+        if key in self._resources:
+            return self._resources[key]
+        lock = self._creation_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            if key in self._resources:
+                return self._resources[key]
+            resource = await _call_and_await_if_needed(factory)
+            closer = None if close is None else (lambda: close(resource))
+            return self.register(key=key, resource=resource, close=closer)
@@ -0,0 +1,121 @@
+"""
+Compares the quantized vector indexes with the float32 one on synthetic clustered embeddings.
+
+Reports, for every index, the RAM taken per stored vector, the queries per second and recall@k against exact search.
+Run it from the repository root with the package and its search extra installed:
+
+    pip install -e .[search]
+    python benchmarks/quantized_vector_index_benchmark.py --vectors 200000 --dimension 384
+"""
+import argparse
+import time
+import typing
+
+import numpy as np
+
+from aiser.knowledge_base.hybrid import (
+    VectorIndex,
+    Float32VectorIndex,
+    Int8VectorIndex,
+    ProductQuantizedVectorIndex
+)
+
+
+def make_clustered_embeddings(
+        number_of_vectors: int,
+        dimension: int,
+        number_of_clusters: int,
+        random_generator: np.random.Generator
+) -> np.ndarray:
+    cluster_centers = random_generator.standard_normal((number_of_clusters, dimension)).astype(np.float32)
+    assignments = random_generator.integers(0, number_of_clusters, size=number_of_vectors)
+    noise = 0.5 * random_generator.standard_normal((number_of_vectors, dimension)).astype(np.float32)
+    embeddings = cluster_centers[assignments] + noise
+    return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+
+def measure(
+        index: VectorIndex,
+        embeddings: np.ndarray,
+        queries: np.ndarray,
+        exact_results: np.ndarray,
+        k: int
+) -> typing.Dict[str, float]:
+    for slot, embedding in enumerate(embeddings):
+        index.add(slot=slot, embedding=embedding)
+    # Drops the spare capacity left by growing, so memory is measured for the stored vectors only.
+    index.compact(live_slots=np.arange(len(embeddings), dtype=np.uint32))
+
+    start = time.perf_counter()
+    found_results = [index.search(query_embedding=query, number_of_results=k)[0] for query in queries]
+    elapsed = time.perf_counter() - start
+
+    recall = np.mean([
+        len(np.intersect1d(found, exact)) / k
+        for found, exact in zip(found_results, exact_results)
+    ])
+    return {
+        "bytes_per_vector": index.memory_usage_in_bytes() / len(embeddings),
+        "queries_per_second": len(queries) / elapsed,
+        "recall": float(recall),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=100_000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--clusters", type=int, default=100)
+    parser.add_argument("--subspaces", type=int, default=48)
+    parser.add_argument("--seed", type=int, default=0)
+    arguments = parser.parse_args()
+
+    random_generator = np.random.default_rng(arguments.seed)
+    embeddings = make_clustered_embeddings(
+        number_of_vectors=arguments.vectors,
+        dimension=arguments.dimension,
+        number_of_clusters=arguments.clusters,
+        random_generator=random_generator
+    )
+    queries = embeddings[random_generator.choice(len(embeddings), size=arguments.queries, replace=False)]
+    queries = queries + 0.1 * random_generator.standard_normal(queries.shape).astype(np.float32)
+    exact_scores = queries @ embeddings.T
+    exact_results = np.argsort(-exact_scores, axis=1)[:, :arguments.k]
+
+    def make_product_quantized_index(rerank_factor: int) -> ProductQuantizedVectorIndex:
+        index = ProductQuantizedVectorIndex(number_of_subspaces=arguments.subspaces, rerank_factor=rerank_factor)
+        training_sample = embeddings[random_generator.choice(len(embeddings), size=min(len(embeddings), 10_000))]
+        index.train(training_sample)
+        return index
+
+    index_factories: typing.Dict[str, typing.Callable[[], VectorIndex]] = {
+        "float32": Float32VectorIndex,
+        "int8": lambda: Int8VectorIndex(rerank_factor=0),
+        "int8 + rerank": lambda: Int8VectorIndex(rerank_factor=4),
+        "pq": lambda: make_product_quantized_index(rerank_factor=0),
+        "pq + rerank": lambda: make_product_quantized_index(rerank_factor=32),
+    }
+
+    print(f"{arguments.vectors} vectors of dimension {arguments.dimension}, recall@{arguments.k}")
+    print(f"{'index':<16}{'bytes/vector':>14}{'compression':>13}{'queries/s':>12}{'recall':>9}")
+    float32_bytes_per_vector: typing.Optional[float] = None
+    for name, make_index in index_factories.items():
+        measurements = measure(
+            index=make_index(),
+            embeddings=embeddings,
+            queries=queries,
+            exact_results=exact_results,
+            k=arguments.k
+        )
+        float32_bytes_per_vector = float32_bytes_per_vector or measurements["bytes_per_vector"]
+        compression = float32_bytes_per_vector / measurements["bytes_per_vector"]
+        print(
+            f"{name:<16}{measurements['bytes_per_vector']:>14.1f}{compression:>12.1f}x"
+            f"{measurements['queries_per_second']:>12.1f}{measurements['recall']:>9.3f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -4,7 +4,7 @@ import asyncio
 from langchain.chat_models import ChatOpenAI
 from langchain.callbacks.base import BaseCallbackHandler
 from langchain.schema import HumanMessage
-from aiser import RestAiServer, Agent
+from aiser import RestAiServer, Agent, SharedResources
 from aiser.models import ChatMessage
 
 
@@ -39,16 +39,23 @@ class PromptBasedAgent(Agent):
         self._starting_prompt = starting_prompt
         self._openai_api_key = openai_api_key
         self._model_name = model_name
+        self._ai_model: typing.Optional[ChatOpenAI] = None
+
+    async def startup(self, resources: SharedResources):
+        # The model and its connection pool are shared by every reply instead of being rebuilt per request.
+        # The key includes the agent id, so agents with their own API keys never share a client.
+        self._ai_model = await resources.get_or_create(
+            key=f"chat-openai/{self.get_id()}/{self._model_name}",
+            factory=self._make_model
+        )
 
     async def reply(self, messages: typing.List[ChatMessage]) -> typing.AsyncGenerator[ChatMessage, None]:
         callback_handler = CustomCallbackHandler()
-        ai_model = self._make_model(
-            callback_handler=callback_handler
-        )
         model_input = self._make_model_input(messages=messages)
         model_execution_task = asyncio.create_task(self._execute_model(
-            chat_model=ai_model,
-            model_input=model_input
+            chat_model=self._ai_model,
+            model_input=model_input,
+            callback_handler=callback_handler
         ))
 
         async for tokens in callback_handler.get_generated_tokens():
@@ -58,13 +65,12 @@ class PromptBasedAgent(Agent):
                 )
         await model_execution_task
 
-    def _make_model(self, callback_handler: CustomCallbackHandler) -> ChatOpenAI:
+    def _make_model(self) -> ChatOpenAI:
         return ChatOpenAI(
             openai_api_key=self._openai_api_key,
             model=self._model_name,
             streaming=True,
             temperature=0,
-            callbacks=[callback_handler],
             verbose=True
         )
 
@@ -82,10 +88,10 @@ class PromptBasedAgent(Agent):
         final_prompt += f"message {len(messages)}:"
         return final_prompt
 
-    async def _execute_model(self, chat_model, model_input: str):
+    async def _execute_model(self, chat_model, model_input: str, callback_handler: CustomCallbackHandler):
         await chat_model.apredict_messages(messages=[
             HumanMessage(content=model_input)
-        ])
+        ], callbacks=[callback_handler])
 
 
 if __name__ == '__main__':
@@ -28,6 +28,9 @@ setup(
         'pyjwt[crypto]',
         'httpx',
     ],
+    extras_require={
+        'search': ['numpy'],
+    },
     license='Apache License 2.0',
     classifiers=[
         'Development Status :: 1 - Planning',
@@ -0,0 +1,156 @@
+import asyncio
+import json
+import typing
+import unittest
+
+from fastapi.testclient import TestClient
+
+from aiser import RestAiServer, Agent
+from aiser.ai_server.authentication import NonFunctionalRestAuthenticator
+from aiser.ai_server.rest_ai_server.agent_chat_websocket_session import AgentChatWebSocketSession
+from aiser.models import ChatMessage
+
+
+class EchoAgent(Agent):
+    async def reply(self, messages: typing.List[ChatMessage]) -> typing.AsyncGenerator[ChatMessage, None]:
+        for character in messages[-1].text_content:
+            yield ChatMessage(text_content=character)
+
+
+class EndlessAgent(Agent):
+    async def reply(self, messages: typing.List[ChatMessage]) -> typing.AsyncGenerator[ChatMessage, None]:
+        while True:
+            yield ChatMessage(text_content=".")
+            await asyncio.sleep(0.01)
+
+
+class QueuedFramesWebSocket:
+    """
+    Hands out queued frames without suspending, like a socket whose frames arrived in one read.
+    A None in the queue stands for the client pausing for a moment.
+    """
+
+    def __init__(self, frames: typing.List[typing.Optional[str]]):
+        self._frames = list(frames) + [None]
+        self.sent_frames: typing.List[dict] = []
+
+    async def accept(self):
+        pass
+
+    async def receive(self) -> dict:
+        while len(self._frames) > 0:
+            frame = self._frames.pop(0)
+            if frame is not None:
+                return {"type": "websocket.receive", "text": frame}
+            await asyncio.sleep(0.1)
+        return {"type": "websocket.disconnect"}
+
+    async def send_text(self, text: str):
+        self.sent_frames.append(json.loads(text))
+
+
+class AgentChatWebSocketTestCase(unittest.TestCase):
+    def setUp(self):
+        server = RestAiServer(
+            agents=[EchoAgent(agent_id="echo"), EndlessAgent(agent_id="endless")],
+            authenticator=NonFunctionalRestAuthenticator()
+        )
+        self.client = TestClient(server.get_app())
+
+    def start_frame(self, stream_id: str, agent_id: str, text: str, credit: int = 16) -> str:
+        return json.dumps({
+            "type": "start",
+            "streamId": stream_id,
+            "agentId": agent_id,
+            "messages": [{"textContent": text}],
+            "credit": credit,
+        })
+
+    def receive_until_end(self, websocket, stream_id: str) -> typing.List[dict]:
+        frames = []
+        while True:
+            frame = websocket.receive_json()
+            if frame.get("streamId") != stream_id:
+                continue
+            frames.append(frame)
+            if frame["type"] in ("end", "error"):
+                return frames
+
+    def test_streams_agent_reply(self):
+        with self.client.websocket_connect("/agent/chat/ws") as websocket:
+            websocket.send_text(self.start_frame(stream_id="a", agent_id="echo", text="hi"))
+            frames = self.receive_until_end(websocket, stream_id="a")
+        self.assertEqual(["h", "i"], [frame["outputMessage"]["textContent"] for frame in frames[:-1]])
+        self.assertEqual({"type": "end", "streamId": "a", "cancelled": False}, frames[-1])
+
+    def test_multiplexes_streams_across_agents(self):
+        with self.client.websocket_connect("/agent/chat/ws") as websocket:
+            websocket.send_text(self.start_frame(stream_id="endless", agent_id="endless", text=""))
+            websocket.send_text(self.start_frame(stream_id="echo", agent_id="echo", text="abc"))
+            echo_frames = self.receive_until_end(websocket, stream_id="echo")
+            websocket.send_text(json.dumps({"type": "cancel", "streamId": "endless"}))
+            endless_frames = self.receive_until_end(websocket, stream_id="endless")
+        self.assertEqual("abc", "".join(frame["outputMessage"]["textContent"] for frame in echo_frames[:-1]))
+        self.assertEqual({"type": "end", "streamId": "endless", "cancelled": True}, endless_frames[-1])
+
+    def test_messages_are_only_sent_while_credit_is_available(self):
+        with self.client.websocket_connect("/agent/chat/ws") as websocket:
+            websocket.send_text(self.start_frame(stream_id="a", agent_id="echo", text="abcd", credit=2))
+            first_frames = [websocket.receive_json(), websocket.receive_json()]
+            websocket.send_text(self.start_frame(stream_id="b", agent_id="echo", text="x"))
+            # Stream "a" is out of credit, so the next frames on the wire belong to stream "b".
+            self.assertEqual("b", websocket.receive_json()["streamId"])
+            self.assertEqual("b", websocket.receive_json()["streamId"])
+            websocket.send_text(json.dumps({"type": "credit", "streamId": "a", "amount": 2}))
+            remaining_frames = self.receive_until_end(websocket, stream_id="a")
+        self.assertEqual(
+            "abcd",
+            "".join(frame["outputMessage"]["textContent"] for frame in first_frames + remaining_frames[:-1])
+        )
+
+    def test_oversized_credit_is_rejected(self):
+        with self.client.websocket_connect("/agent/chat/ws") as websocket:
+            websocket.send_text(json.dumps({"type": "credit", "streamId": "a", "amount": 30000000}))
+            frame = websocket.receive_json()
+        self.assertEqual("error", frame["type"])
+
+    def test_binary_frame_is_answered_with_error_and_connection_stays_open(self):
+        with self.client.websocket_connect("/agent/chat/ws") as websocket:
+            websocket.send_bytes(b"binary")
+            error_frame = websocket.receive_json()
+            websocket.send_text(self.start_frame(stream_id="a", agent_id="echo", text="ok"))
+            frames = self.receive_until_end(websocket, stream_id="a")
+        self.assertEqual("error", error_frame["type"])
+        self.assertEqual("end", frames[-1]["type"])
+
+    def test_unknown_agent_reports_error_on_stream(self):
+        with self.client.websocket_connect("/agent/chat/ws") as websocket:
+            websocket.send_text(self.start_frame(stream_id="a", agent_id="missing", text="hi"))
+            frame = websocket.receive_json()
+        self.assertEqual("error", frame["type"])
+        self.assertEqual("a", frame["streamId"])
+
+
+class AgentChatWebSocketSessionTestCase(unittest.IsolatedAsyncioTestCase):
+    async def test_stream_cancelled_before_it_ran_is_ended_and_released(self):
+        start_frame = json.dumps({
+            "type": "start",
+            "streamId": "a",
+            "agentId": "echo",
+            "messages": [{"textContent": "hi"}],
+        })
+        websocket = QueuedFramesWebSocket(frames=[
+            start_frame,
+            json.dumps({"type": "cancel", "streamId": "a"}),
+            None,
+            start_frame,
+        ])
+        session = AgentChatWebSocketSession(
+            websocket=websocket,
+            find_agent=lambda agent_id: EchoAgent(agent_id=agent_id),
+            max_concurrent_streams=1
+        )
+        await session.run()
+        self.assertIn({"type": "end", "streamId": "a", "cancelled": True}, websocket.sent_frames)
+        self.assertIn({"type": "end", "streamId": "a", "cancelled": False}, websocket.sent_frames)
+        self.assertNotIn("error", [frame["type"] for frame in websocket.sent_frames])
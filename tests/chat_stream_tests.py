@@ -0,0 +1,188 @@
+import asyncio
+import contextlib
+import json
+import os
+import typing
+import unittest
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+from aiser import RestAiServer, Agent
+from aiser.ai_server.authentication import NonFunctionalRestAuthenticator
+from aiser.ai_server.rest_ai_server.chat_stream_registry import (
+    ChatStream,
+    ChatStreamRegistry,
+    ChatStreamFailedError,
+    ReplayUnavailableError
+)
+from aiser.models import ChatMessage
+
+
+class CountingAgent(Agent):
+    def __init__(self, agent_id: str):
+        super().__init__(agent_id=agent_id)
+        self.number_of_replies = 0
+
+    async def reply(self, messages: typing.List[ChatMessage]) -> typing.AsyncGenerator[ChatMessage, None]:
+        self.number_of_replies += 1
+        for character in "hello":
+            yield ChatMessage(text_content=character)
+
+
+class FailingAgent(Agent):
+    async def reply(self, messages: typing.List[ChatMessage]) -> typing.AsyncGenerator[ChatMessage, None]:
+        yield ChatMessage(text_content="partial")
+        raise RuntimeError("model unavailable")
+
+
+async def generate_messages(text: str) -> typing.AsyncGenerator[ChatMessage, None]:
+    for character in text:
+        yield ChatMessage(text_content=character)
+        await asyncio.sleep(0)
+
+
+async def read_text(chat_stream: ChatStream, from_sequence_number: int, limit: int = 1000) -> str:
+    text = ""
+    async with contextlib.aclosing(chat_stream.read_from(sequence_number=from_sequence_number)) as frames:
+        async for _, message in frames:
+            text += message.text_content
+            if len(text) >= limit:
+                break
+    return text
+
+
+class ResumableChatEndpointTestCase(unittest.TestCase):
+    def setUp(self):
+        self.agent = CountingAgent(agent_id="agent")
+        server = RestAiServer(
+            agents=[self.agent, FailingAgent(agent_id="failing")],
+            authenticator=NonFunctionalRestAuthenticator(),
+            chat_replay_buffer_size=3
+        )
+        self.client = TestClient(server.get_app())
+
+    def parse_frames(self, response) -> typing.List[dict]:
+        return [json.loads(line) for line in response.text.splitlines()]
+
+    def test_frames_carry_stream_id_and_sequence_numbers(self):
+        response = self.client.post("/agent/agent/chat", json={"messages": []})
+        frames = self.parse_frames(response)
+        self.assertEqual([0, 1, 2, 3, 4], [frame["sequenceNumber"] for frame in frames])
+        self.assertEqual({response.headers["Aiser-Stream-Id"]}, {frame["streamId"] for frame in frames})
+
+    def test_resume_replays_finished_output_without_generating_again(self):
+        stream_id = self.client.post("/agent/agent/chat", json={"messages": []}).headers["Aiser-Stream-Id"]
+        response = self.client.post(f"/agent/agent/chat/{stream_id}/resume", json={"fromSequenceNumber": 3})
+        self.assertEqual("lo", "".join(frame["outputMessage"]["textContent"] for frame in self.parse_frames(response)))
+        self.assertEqual(1, self.agent.number_of_replies)
+
+    def test_failing_agent_ends_stream_with_error_line(self):
+        frames = self.parse_frames(self.client.post("/agent/failing/chat", json={"messages": []}))
+        self.assertEqual("partial", frames[0]["outputMessage"]["textContent"])
+        self.assertEqual("Agent reply failed: model unavailable", frames[-1]["detail"])
+        self.assertNotIn("outputMessage", frames[-1])
+
+    def test_resume_reports_dropped_frames_and_unknown_streams(self):
+        stream_id = self.client.post("/agent/agent/chat", json={"messages": []}).headers["Aiser-Stream-Id"]
+        dropped_response = self.client.post(f"/agent/agent/chat/{stream_id}/resume", json={"fromSequenceNumber": 0})
+        unknown_response = self.client.post("/agent/agent/chat/unknown/resume", json={"fromSequenceNumber": 0})
+        self.assertEqual(410, dropped_response.status_code)
+        self.assertEqual(404, unknown_response.status_code)
+
+    def test_resume_of_stream_from_other_worker_is_misdirected(self):
+        stream_id = self.client.post("/agent/agent/chat", json={"messages": []}).headers["Aiser-Stream-Id"]
+        _, _, unique_part = stream_id.partition("-")
+        response = self.client.post(
+            f"/agent/agent/chat/{os.getpid() + 1}-{unique_part}/resume",
+            json={"fromSequenceNumber": 0}
+        )
+        self.assertEqual(421, response.status_code)
+
+    def test_frames_dropped_after_resume_check_end_stream_with_error_line(self):
+        stream_id = self.client.post("/agent/agent/chat", json={"messages": []}).headers["Aiser-Stream-Id"]
+
+        async def read_dropped_frames(_, sequence_number: int) -> typing.AsyncGenerator:
+            raise ReplayUnavailableError(f"Frame {sequence_number} was dropped")
+            yield
+
+        with mock.patch.object(ChatStream, "read_from", read_dropped_frames):
+            response = self.client.post(f"/agent/agent/chat/{stream_id}/resume", json={"fromSequenceNumber": 3})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual([{"streamId": stream_id, "detail": "Frame 3 was dropped"}], self.parse_frames(response))
+
+    def test_resume_ahead_of_stream_is_rejected(self):
+        stream_id = self.client.post("/agent/agent/chat", json={"messages": []}).headers["Aiser-Stream-Id"]
+        at_end_response = self.client.post(f"/agent/agent/chat/{stream_id}/resume", json={"fromSequenceNumber": 5})
+        ahead_response = self.client.post(f"/agent/agent/chat/{stream_id}/resume", json={"fromSequenceNumber": 6})
+        self.assertEqual(200, at_end_response.status_code)
+        self.assertEqual([], self.parse_frames(at_end_response))
+        self.assertEqual(400, ahead_response.status_code)
+
+
+class ChatStreamTestCase(unittest.IsolatedAsyncioTestCase):
+    async def test_consumer_reattaches_to_running_generation(self):
+        chat_stream = ChatStream(stream_id="stream", agent_id="agent", replay_buffer_size=100)
+        chat_stream.start(message_gen=generate_messages("abcdef"))
+        first_part = await read_text(chat_stream=chat_stream, from_sequence_number=0, limit=2)
+        rest = await read_text(chat_stream=chat_stream, from_sequence_number=2)
+        self.assertEqual("ab", first_part)
+        self.assertEqual("cdef", rest)
+
+    async def test_undelivered_frames_are_never_dropped(self):
+        chat_stream = ChatStream(stream_id="stream", agent_id="agent", replay_buffer_size=2)
+        chat_stream.start(message_gen=generate_messages("abcdef"))
+        await asyncio.sleep(0.05)
+        self.assertEqual("abcdef", await read_text(chat_stream=chat_stream, from_sequence_number=0))
+        with self.assertRaises(ReplayUnavailableError):
+            await read_text(chat_stream=chat_stream, from_sequence_number=0)
+        self.assertEqual("ef", await read_text(chat_stream=chat_stream, from_sequence_number=4))
+
+    async def test_fast_consumer_does_not_drop_frames_of_slow_consumer(self):
+        chat_stream = ChatStream(stream_id="stream", agent_id="agent", replay_buffer_size=2)
+        chat_stream.start(message_gen=generate_messages("abcdef"))
+
+        async def read_text_slowly() -> str:
+            text = ""
+            async for _, message in chat_stream.read_from(sequence_number=0):
+                text += message.text_content
+                await asyncio.sleep(0.01)
+            return text
+
+        slow_text, fast_text = await asyncio.gather(
+            read_text_slowly(),
+            read_text(chat_stream=chat_stream, from_sequence_number=0)
+        )
+        self.assertEqual("abcdef", slow_text)
+        self.assertEqual("abcdef", fast_text)
+
+    async def test_failure_is_raised_after_last_frame(self):
+        chat_stream = ChatStream(stream_id="stream", agent_id="agent", replay_buffer_size=100)
+        chat_stream.start(message_gen=FailingAgent(agent_id="failing").reply(messages=[]))
+        frames = []
+        with self.assertRaises(ChatStreamFailedError):
+            async for frame in chat_stream.read_from(sequence_number=0):
+                frames.append(frame)
+        self.assertEqual([0], [sequence_number for sequence_number, _ in frames])
+
+    async def test_expired_streams_are_dropped_and_stopped(self):
+        registry = ChatStreamRegistry(time_to_live_in_seconds=0)
+        chat_stream = registry.start_stream(agent_id="agent", message_gen=generate_messages("a" * 100))
+        await asyncio.sleep(0.01)
+        self.assertIsNone(registry.get_stream(stream_id=chat_stream.stream_id, agent_id="agent"))
+        await registry.close()
+
+    async def test_open_registry_stops_expired_streams_without_further_traffic(self):
+        registry = ChatStreamRegistry(replay_buffer_size=2, time_to_live_in_seconds=0.01)
+        registry.open()
+        chat_stream = registry.start_stream(agent_id="agent", message_gen=generate_messages("a" * 100))
+        await asyncio.sleep(0.2)
+        await asyncio.wait_for(chat_stream.wait_until_finished(), timeout=1)
+        await registry.close()
+
+    async def test_close_waits_for_generation_to_stop(self):
+        registry = ChatStreamRegistry(replay_buffer_size=2)
+        chat_stream = registry.start_stream(agent_id="agent", message_gen=generate_messages("a" * 100))
+        await asyncio.sleep(0.01)
+        await registry.close()
+        self.assertTrue(chat_stream._task.done())
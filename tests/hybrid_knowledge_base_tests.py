@@ -0,0 +1,115 @@
+import math
+import typing
+import unittest
+
+from aiser.knowledge_base.hybrid import HybridKnowledgeBase, ScoreFusion, Bm25Index
+
+TOPIC_EMBEDDINGS = {
+    "cat": [1.0, 0.0, 0.0],
+    "kitten": [1.0, 0.0, 0.0],
+    "car": [0.0, 1.0, 0.0],
+    "vehicle": [0.0, 1.0, 0.0],
+}
+
+
+def embed_by_topic(texts: typing.List[str]) -> typing.List[typing.List[float]]:
+    embeddings = []
+    for text in texts:
+        embedding = [0.0, 0.0, 0.1]
+        for word in text.lower().split():
+            for dimension, value in enumerate(TOPIC_EMBEDDINGS.get(word, [0.0, 0.0, 0.0])):
+                embedding[dimension] += value
+        embeddings.append(embedding)
+    return embeddings
+
+
+class Bm25IndexTestCase(unittest.TestCase):
+    def test_scores_match_reference_formula(self):
+        index = Bm25Index(k1=1.2, b=0.75)
+        documents = ["alpha beta", "alpha alpha gamma delta", "gamma"]
+        for slot, document in enumerate(documents):
+            index.add(slot=slot, text=document)
+        slots, scores = index.score(query_text="alpha")
+
+        average_length = (2 + 4 + 1) / 3
+        idf = math.log(1 + (3 - 2 + 0.5) / (2 + 0.5))
+
+        def expected(term_frequency: int, length: int) -> float:
+            return idf * term_frequency * 2.2 / (term_frequency + 1.2 * (1 - 0.75 + 0.75 * length / average_length))
+
+        self.assertEqual([0, 1], list(slots))
+        self.assertAlmostEqual(expected(1, 2), float(scores[0]), places=5)
+        self.assertAlmostEqual(expected(2, 4), float(scores[1]), places=5)
+
+    def test_removed_document_no_longer_matches(self):
+        index = Bm25Index()
+        index.add(slot=0, text="alpha")
+        index.add(slot=1, text="alpha beta")
+        index.remove(slot=0, text="alpha")
+        slots, _ = index.score(query_text="alpha")
+        self.assertEqual([1], list(slots))
+        self.assertEqual(1, index.number_of_documents)
+
+
+class HybridKnowledgeBaseTestCase(unittest.TestCase):
+    def make_knowledge_base(self, score_fusion: str = ScoreFusion.RECIPROCAL_RANK) -> HybridKnowledgeBase:
+        knowledge_base = HybridKnowledgeBase(
+            knowledge_base_id="kb",
+            embed_texts=embed_by_topic,
+            score_fusion=score_fusion
+        )
+        knowledge_base.upsert_documents({
+            "pets": "my cat sleeps all day",
+            "cars": "the car needs new tires",
+            "error": "error code ERR_4711 means the disk is full",
+        })
+        return knowledge_base
+
+    def test_finds_exact_identifier_through_lexical_search(self):
+        results = self.make_knowledge_base().perform_semantic_search(
+            query_text="ERR_4711",
+            desired_number_of_results=1
+        )
+        self.assertEqual("error code ERR_4711 means the disk is full", results[0].content)
+
+    def test_finds_related_document_through_vector_search(self):
+        for score_fusion in (ScoreFusion.RECIPROCAL_RANK, ScoreFusion.WEIGHTED):
+            results = self.make_knowledge_base(score_fusion=score_fusion).perform_semantic_search(
+                query_text="kitten",
+                desired_number_of_results=1
+            )
+            self.assertEqual("my cat sleeps all day", results[0].content)
+
+    def test_documents_can_be_replaced_and_removed_incrementally(self):
+        knowledge_base = self.make_knowledge_base()
+        knowledge_base.upsert_document(document_id="cars", content="the vehicle is parked")
+        self.assertTrue(knowledge_base.remove_document(document_id="error"))
+
+        contents = [
+            result.content
+            for result in knowledge_base.perform_semantic_search(query_text="tires ERR_4711", desired_number_of_results=5)
+        ]
+        self.assertEqual(2, len(knowledge_base))
+        self.assertNotIn("the car needs new tires", contents)
+        self.assertNotIn("error code ERR_4711 means the disk is full", contents)
+        self.assertIn("the vehicle is parked", contents)
+
+    def test_results_are_sorted_by_score(self):
+        results = self.make_knowledge_base().perform_semantic_search(
+            query_text="cat car",
+            desired_number_of_results=3
+        )
+        scores = [result.score for result in results]
+        self.assertEqual(sorted(scores, reverse=True), scores)
+
+    def test_slots_of_replaced_documents_are_compacted(self):
+        knowledge_base = self.make_knowledge_base()
+        for version in range(3000):
+            knowledge_base.upsert_document(document_id="cars", content=f"the car has version {version}")
+        self.assertTrue(knowledge_base.remove_document(document_id="pets"))
+
+        self.assertLess(knowledge_base._next_slot, 2100)
+        results = knowledge_base.perform_semantic_search(query_text="version 2999", desired_number_of_results=2)
+        self.assertEqual("the car has version 2999", results[0].content)
+        results = knowledge_base.perform_semantic_search(query_text="ERR_4711", desired_number_of_results=1)
+        self.assertEqual("error code ERR_4711 means the disk is full", results[0].content)
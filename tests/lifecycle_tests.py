@@ -0,0 +1,123 @@
+import typing
+import unittest
+
+import httpx
+from fastapi.testclient import TestClient
+
+from aiser import RestAiServer, Agent, KnowledgeBase, SemanticSearchResult, SharedResources
+from aiser.ai_server.authentication import NonFunctionalRestAuthenticator
+from aiser.models import ChatMessage
+
+
+class RecordingAgent(Agent):
+    def __init__(self, agent_id: str, events: typing.List[str]):
+        super().__init__(agent_id=agent_id)
+        self.events = events
+        self.http_client: typing.Optional[httpx.AsyncClient] = None
+
+    async def startup(self, resources: SharedResources):
+        self.events.append(f"startup {self.get_id()}")
+        self.http_client = resources.http_client
+        await resources.get_or_create(
+            key="model",
+            factory=lambda: object(),
+            close=lambda _: self.events.append("close model")
+        )
+
+    async def shutdown(self):
+        self.events.append(f"shutdown {self.get_id()}")
+
+    async def reply(self, messages: typing.List[ChatMessage]) -> typing.AsyncGenerator[ChatMessage, None]:
+        yield ChatMessage(text_content="ok")
+
+
+class RecordingKnowledgeBase(KnowledgeBase):
+    def __init__(self, knowledge_base_id: str, events: typing.List[str]):
+        super().__init__(knowledge_base_id=knowledge_base_id)
+        self.events = events
+
+    async def startup(self, resources: SharedResources):
+        self.events.append(f"startup {self.get_id()}")
+
+    async def shutdown(self):
+        self.events.append(f"shutdown {self.get_id()}")
+
+    def perform_semantic_search(self, query_text: str, desired_number_of_results: int) -> typing.List[SemanticSearchResult]:
+        return []
+
+
+class LifecycleHooksTestCase(unittest.TestCase):
+    def test_hooks_run_once_around_serving_and_share_resources(self):
+        events = []
+        agents = [RecordingAgent(agent_id="a", events=events), RecordingAgent(agent_id="b", events=events)]
+        server = RestAiServer(
+            agents=agents,
+            knowledge_bases=[RecordingKnowledgeBase(knowledge_base_id="kb", events=events)],
+            authenticator=NonFunctionalRestAuthenticator()
+        )
+        with TestClient(server.get_app()) as client:
+            client.post("/agent/a/chat", json={"messages": []})
+            client.post("/agent/b/chat", json={"messages": []})
+            self.assertEqual(["startup kb", "startup a", "startup b"], events)
+            self.assertIs(agents[0].http_client, agents[1].http_client)
+        self.assertEqual(
+            ["startup kb", "startup a", "startup b", "shutdown b", "shutdown a", "shutdown kb", "close model"],
+            events
+        )
+        self.assertTrue(agents[0].http_client.is_closed)
+
+
+class FailingShutdownAgent(RecordingAgent):
+    async def shutdown(self):
+        await super().shutdown()
+        raise RuntimeError("shutdown failed")
+
+
+class FailingShutdownTestCase(unittest.IsolatedAsyncioTestCase):
+    async def test_failing_shutdown_does_not_skip_other_entities_or_resources(self):
+        events = []
+        agents = [RecordingAgent(agent_id="a", events=events), FailingShutdownAgent(agent_id="b", events=events)]
+        server = RestAiServer(agents=agents, authenticator=NonFunctionalRestAuthenticator())
+        await server._start_up_entities()
+        with self.assertRaises(RuntimeError):
+            await server._shut_down_entities()
+        self.assertEqual(["shutdown b", "shutdown a", "close model"], events[2:])
+        self.assertTrue(agents[0].http_client.is_closed)
+
+
+class SharedResourcesTestCase(unittest.IsolatedAsyncioTestCase):
+    async def test_get_or_create_builds_resource_once(self):
+        resources = SharedResources()
+        await resources.open()
+        created = []
+
+        async def make_resource():
+            created.append(1)
+            return "resource"
+
+        first = await resources.get_or_create(key="r", factory=make_resource)
+        second = await resources.get_or_create(key="r", factory=make_resource)
+        await resources.close()
+        self.assertEqual("resource", first)
+        self.assertEqual("resource", second)
+        self.assertEqual(1, len(created))
+
+    async def test_http_client_is_unavailable_before_open(self):
+        with self.assertRaises(RuntimeError):
+            _ = SharedResources().http_client
+
+    async def test_failing_closer_does_not_skip_other_closers(self):
+        resources = SharedResources()
+        await resources.open()
+        http_client = resources.http_client
+        closed = []
+
+        def fail():
+            raise RuntimeError("close failed")
+
+        resources.register(key="first", resource=1, close=lambda: closed.append("first"))
+        resources.register(key="failing", resource=2, close=fail)
+        with self.assertRaises(RuntimeError):
+            await resources.close()
+        self.assertEqual(["first"], closed)
+        self.assertTrue(http_client.is_closed)
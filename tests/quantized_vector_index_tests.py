@@ -0,0 +1,98 @@
+import asyncio
+import unittest
+
+import numpy as np
+
+from aiser.knowledge_base.hybrid import (
+    HybridKnowledgeBase,
+    Float32VectorIndex,
+    Int8VectorIndex,
+    ProductQuantizedVectorIndex
+)
+
+
+def make_embeddings(number_of_vectors: int = 2000, dimension: int = 32) -> np.ndarray:
+    random_generator = np.random.default_rng(0)
+    embeddings = random_generator.standard_normal((number_of_vectors, dimension)).astype(np.float32)
+    return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+
+def recall_at_k(index, embeddings: np.ndarray, queries: np.ndarray, k: int) -> float:
+    exact_results = np.argsort(-(queries @ embeddings.T), axis=1)[:, :k]
+    found_results = [index.search(query_embedding=query, number_of_results=k)[0] for query in queries]
+    return float(np.mean([
+        len(np.intersect1d(found, exact)) / k
+        for found, exact in zip(found_results, exact_results)
+    ]))
+
+
+class QuantizedVectorIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.embeddings = make_embeddings()
+        self.queries = self.embeddings[:20]
+
+    def fill(self, index):
+        for slot, embedding in enumerate(self.embeddings):
+            index.add(slot=slot, embedding=embedding)
+        return index
+
+    def test_int8_index_takes_a_quarter_of_float32_memory(self):
+        float32_index = self.fill(Float32VectorIndex())
+        int8_index = self.fill(Int8VectorIndex())
+        self.assertLess(int8_index.memory_usage_in_bytes(), float32_index.memory_usage_in_bytes() * 0.3)
+
+    def test_int8_index_with_reranking_returns_exact_scores(self):
+        index = self.fill(Int8VectorIndex(rerank_factor=4))
+        slots, scores = index.search(query_embedding=self.queries[0], number_of_results=5)
+        np.testing.assert_allclose(self.embeddings[slots] @ self.queries[0], scores, rtol=1e-5)
+        self.assertEqual(1.0, recall_at_k(index, self.embeddings, self.queries, k=10))
+
+    def test_int8_index_without_reranking_has_high_recall(self):
+        index = self.fill(Int8VectorIndex(rerank_factor=0))
+        self.assertGreaterEqual(recall_at_k(index, self.embeddings, self.queries, k=10), 0.9)
+
+    def test_product_quantized_index_reranking_recovers_recall(self):
+        index = ProductQuantizedVectorIndex(number_of_subspaces=8, number_of_centroids=64, rerank_factor=32)
+        index.train(self.embeddings)
+        self.fill(index)
+        self.assertGreaterEqual(recall_at_k(index, self.embeddings, self.queries, k=5), 0.9)
+        self.assertLess(index.memory_usage_in_bytes(), self.fill(Float32VectorIndex()).memory_usage_in_bytes() / 8)
+
+    def test_product_quantized_index_must_be_trained_first(self):
+        with self.assertRaises(RuntimeError):
+            ProductQuantizedVectorIndex().add(slot=0, embedding=self.embeddings[0])
+
+    def test_removed_vectors_are_not_returned(self):
+        index = self.fill(Int8VectorIndex())
+        index.remove(slot=0)
+        slots, _ = index.search(query_embedding=self.queries[0], number_of_results=5)
+        self.assertNotIn(0, list(slots))
+
+    def test_hybrid_knowledge_base_accepts_quantized_index(self):
+        knowledge_base = HybridKnowledgeBase(
+            knowledge_base_id="kb",
+            embed_texts=lambda texts: [self.embeddings[int(text.split()[-1])] for text in texts],
+            vector_index=Int8VectorIndex()
+        )
+        knowledge_base.upsert_documents({f"document {index}": f"document {index}" for index in range(100)})
+        results = knowledge_base.perform_semantic_search(query_text="7", desired_number_of_results=1)
+        self.assertEqual("document 7", results[0].content)
+
+    def test_compacted_index_returns_renumbered_slots(self):
+        for index in (Int8VectorIndex(rerank_factor=4), Float32VectorIndex()):
+            self.fill(index)
+            live_slots = np.arange(1, len(self.embeddings), 2, dtype=np.uint32)
+            index.compact(live_slots=live_slots)
+            slots, _ = index.search(query_embedding=self.embeddings[7], number_of_results=1)
+            self.assertEqual([3], list(slots))
+
+    def test_hybrid_knowledge_base_shutdown_closes_vector_index(self):
+        vector_index = Int8VectorIndex(rerank_factor=4)
+        knowledge_base = HybridKnowledgeBase(
+            knowledge_base_id="kb",
+            embed_texts=lambda texts: [self.embeddings[0] for _ in texts],
+            vector_index=vector_index
+        )
+        knowledge_base.upsert_document(document_id="document", content="document")
+        asyncio.run(knowledge_base.shutdown())
+        self.assertIsNone(vector_index._full_precision_store)
@@ -0,0 +1,249 @@
+import asyncio
+import os
+import signal
+import time
+import typing
+import unittest
+
+import httpx
+
+from aiser import RestAiServer, KnowledgeBase, SemanticSearchResult, SharedResources
+from aiser.ai_server.authentication import NonFunctionalRestAuthenticator
+from aiser.knowledge_base.sharded import (
+    ShardedKnowledgeBase,
+    ProcessKnowledgeBaseShard,
+    RestKnowledgeBaseShard,
+    assign_shard,
+    merge_top_results
+)
+
+CORPUS = {f"document-{index}": float(index) for index in range(20)}
+
+
+class ScoredCorpusKnowledgeBase(KnowledgeBase):
+    def __init__(self, knowledge_base_id: str, scores_by_content: typing.Dict[str, float], delay_in_seconds: float):
+        super().__init__(knowledge_base_id=knowledge_base_id)
+        self._scores_by_content = scores_by_content
+        self._delay_in_seconds = delay_in_seconds
+
+    def perform_semantic_search(
+            self,
+            query_text: str,
+            desired_number_of_results: int
+    ) -> typing.List[SemanticSearchResult]:
+        time.sleep(self._delay_in_seconds)
+        results = [
+            SemanticSearchResult(content=content, score=score)
+            for content, score in self._scores_by_content.items()
+        ]
+        return sorted(results, key=lambda result: result.score, reverse=True)[:desired_number_of_results]
+
+
+class SlowQueryKnowledgeBase(ScoredCorpusKnowledgeBase):
+    def perform_semantic_search(
+            self,
+            query_text: str,
+            desired_number_of_results: int
+    ) -> typing.List[SemanticSearchResult]:
+        if query_text == "slow":
+            time.sleep(1.5)
+        return super().perform_semantic_search(
+            query_text=query_text,
+            desired_number_of_results=desired_number_of_results
+        )
+
+
+def make_slow_query_knowledge_base() -> SlowQueryKnowledgeBase:
+    return SlowQueryKnowledgeBase(knowledge_base_id="shard", scores_by_content=CORPUS, delay_in_seconds=0)
+
+
+def make_slowly_loading_knowledge_base() -> ScoredCorpusKnowledgeBase:
+    time.sleep(1)
+    return ScoredCorpusKnowledgeBase(knowledge_base_id="shard", scores_by_content=CORPUS, delay_in_seconds=0)
+
+
+def make_failing_knowledge_base() -> ScoredCorpusKnowledgeBase:
+    raise ValueError("corpus missing")
+
+
+def make_shard_knowledge_base(
+        shard_index: int,
+        number_of_shards: int,
+        delay_in_seconds: float = 0
+) -> ScoredCorpusKnowledgeBase:
+    return ScoredCorpusKnowledgeBase(
+        knowledge_base_id=f"shard-{shard_index}",
+        scores_by_content={
+            content: score
+            for content, score in CORPUS.items()
+            if assign_shard(document_id=content, number_of_shards=number_of_shards) == shard_index
+        },
+        delay_in_seconds=delay_in_seconds
+    )
+
+
+def make_process_shards(number_of_shards: int, slow_shard_index: typing.Optional[int] = None):
+    return [
+        ProcessKnowledgeBaseShard(
+            name=f"shard-{shard_index}",
+            knowledge_base_factory=make_shard_knowledge_base,
+            factory_kwargs={
+                "shard_index": shard_index,
+                "number_of_shards": number_of_shards,
+                "delay_in_seconds": 2 if shard_index == slow_shard_index else 0
+            }
+        )
+        for shard_index in range(number_of_shards)
+    ]
+
+
+class ShardedKnowledgeBaseTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.resources = SharedResources()
+        await self.resources.open()
+
+    async def asyncTearDown(self):
+        await self.resources.close()
+
+    async def test_merges_top_results_of_process_shards(self):
+        knowledge_base = ShardedKnowledgeBase(
+            knowledge_base_id="kb",
+            shards=make_process_shards(number_of_shards=3)
+        )
+        await knowledge_base.startup(resources=self.resources)
+        try:
+            results = await knowledge_base.perform_semantic_search(query_text="query", desired_number_of_results=5)
+        finally:
+            await knowledge_base.shutdown()
+        self.assertEqual(
+            [f"document-{index}" for index in range(19, 14, -1)],
+            [result.content for result in results]
+        )
+
+    async def test_slow_shard_yields_partial_results(self):
+        knowledge_base = ShardedKnowledgeBase(
+            knowledge_base_id="kb",
+            shards=make_process_shards(number_of_shards=3, slow_shard_index=0),
+            shard_timeout_in_seconds=0.5
+        )
+        await knowledge_base.startup(resources=self.resources)
+        try:
+            sharded_search_result = await knowledge_base.search_shards(
+                query_text="query",
+                desired_number_of_results=20
+            )
+        finally:
+            await knowledge_base.shutdown()
+        self.assertTrue(sharded_search_result.is_partial)
+        self.assertEqual(["shard-0"], sharded_search_result.unavailable_shards)
+        expected_contents = {
+            content for content in CORPUS
+            if assign_shard(document_id=content, number_of_shards=3) != 0
+        }
+        self.assertEqual(expected_contents, {result.content for result in sharded_search_result.results})
+
+    async def test_searches_after_timeout_fail_fast_until_shard_is_free(self):
+        knowledge_base = ShardedKnowledgeBase(
+            knowledge_base_id="kb",
+            shards=[ProcessKnowledgeBaseShard(name="shard", knowledge_base_factory=make_slow_query_knowledge_base)],
+            shard_timeout_in_seconds=0.5
+        )
+        await knowledge_base.startup(resources=self.resources)
+        try:
+            await knowledge_base.search_shards(query_text="query", desired_number_of_results=1)
+            timed_out_search_result = await knowledge_base.search_shards(query_text="slow", desired_number_of_results=1)
+            search_results_while_busy = []
+            for _ in range(3):
+                started_at = time.monotonic()
+                search_results_while_busy.append(
+                    await knowledge_base.search_shards(query_text="query", desired_number_of_results=1)
+                )
+                self.assertLess(time.monotonic() - started_at, 0.2)
+            await asyncio.sleep(1.5)
+            search_result_when_free = await knowledge_base.search_shards(
+                query_text="query",
+                desired_number_of_results=1
+            )
+        finally:
+            await knowledge_base.shutdown()
+        self.assertTrue(timed_out_search_result.is_partial)
+        self.assertTrue(all(search_result.is_partial for search_result in search_results_while_busy))
+        self.assertFalse(search_result_when_free.is_partial)
+        self.assertEqual(["document-19"], [result.content for result in search_result_when_free.results])
+
+    async def test_corpus_is_loaded_at_startup(self):
+        knowledge_base = ShardedKnowledgeBase(
+            knowledge_base_id="kb",
+            shards=[ProcessKnowledgeBaseShard(name="shard", knowledge_base_factory=make_slowly_loading_knowledge_base)],
+            shard_timeout_in_seconds=0.5
+        )
+        await knowledge_base.startup(resources=self.resources)
+        try:
+            sharded_search_result = await knowledge_base.search_shards(query_text="query", desired_number_of_results=1)
+        finally:
+            await knowledge_base.shutdown()
+        self.assertFalse(sharded_search_result.is_partial)
+
+    async def test_failing_factory_fails_startup(self):
+        shard = ProcessKnowledgeBaseShard(name="shard", knowledge_base_factory=make_failing_knowledge_base)
+        with self.assertRaises(ValueError):
+            await shard.start(resources=self.resources)
+
+    async def test_shard_process_is_restarted_after_it_died(self):
+        shard = ProcessKnowledgeBaseShard(name="shard", knowledge_base_factory=make_slowly_loading_knowledge_base)
+        knowledge_base = ShardedKnowledgeBase(knowledge_base_id="kb", shards=[shard], shard_timeout_in_seconds=0.5)
+        await knowledge_base.startup(resources=self.resources)
+        try:
+            for process_id in list(shard._executor._processes):
+                os.kill(process_id, signal.SIGKILL)
+            search_result_after_kill = await knowledge_base.search_shards(
+                query_text="query",
+                desired_number_of_results=1
+            )
+            search_result_while_reloading = await knowledge_base.search_shards(
+                query_text="query",
+                desired_number_of_results=1
+            )
+            await asyncio.sleep(1.5)
+            search_result_after_reload = await knowledge_base.search_shards(
+                query_text="query",
+                desired_number_of_results=1
+            )
+        finally:
+            await knowledge_base.shutdown()
+        self.assertEqual(["shard"], search_result_after_kill.unavailable_shards)
+        self.assertEqual(["shard"], search_result_while_reloading.unavailable_shards)
+        self.assertFalse(search_result_after_reload.is_partial)
+
+    async def test_queries_remote_shard_through_semantic_search_endpoint(self):
+        remote_server = RestAiServer(
+            knowledge_bases=[make_shard_knowledge_base(shard_index=0, number_of_shards=1)],
+            authenticator=NonFunctionalRestAuthenticator()
+        )
+        resources = SharedResources(http_client_factory=lambda: httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=remote_server.get_app())
+        ))
+        knowledge_base = ShardedKnowledgeBase(
+            knowledge_base_id="kb",
+            shards=[RestKnowledgeBaseShard(server_url="http://remote", knowledge_base_id="shard-0")]
+        )
+        await resources.open()
+        await knowledge_base.startup(resources=resources)
+        try:
+            results = await knowledge_base.perform_semantic_search(query_text="query", desired_number_of_results=2)
+        finally:
+            await knowledge_base.shutdown()
+            await resources.close()
+        self.assertEqual(["document-19", "document-18"], [result.content for result in results])
+
+
+class MergeTopResultsTestCase(unittest.TestCase):
+    def test_keeps_best_results_over_all_shards(self):
+        merged = merge_top_results(
+            shard_results=[
+                [SemanticSearchResult(content="a", score=0.9), SemanticSearchResult(content="b", score=0.1)],
+                [SemanticSearchResult(content="c", score=0.5), SemanticSearchResult(content="d", score=None)],
+            ],
+            desired_number_of_results=3
+        )
+        self.assertEqual(["a", "c", "b"], [result.content for result in merged])